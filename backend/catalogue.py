@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from search import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+# catalogue_state holds one small document per catalogue: {_id, revision, updated_at}
+STATE_ID = "exercises"
+
+
+class CatalogueSnapshot:
+    def __init__(self, exercises: List[dict], revision: int = 0):
+        # Monotonic across workers; version below is a hash of the content
+        self.revision = revision
+        self.by_id: Dict[str, dict] = {ex["id"]: ex for ex in exercises}
+        self.by_level: Dict[str, Tuple[bytes, str]] = {}
+        grouped: Dict[str, List[dict]] = {}
+        for ex in exercises:
+            grouped.setdefault(ex["level"], []).append(ex)
+        for level, items in grouped.items():
+            body = json.dumps(items, separators=(",", ":")).encode()
+            self.by_level[level] = (body, _etag(body))
+        self.version = hashlib.sha256(json.dumps(exercises, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+EMPTY_LEVEL = (b"[]", _etag(b"[]"))
+
+
+class ExerciseCatalogue:
+    """Read-only, pre-serialized view of the exercises collection.
+
+    ``reload`` builds a complete new snapshot before swapping it in, so
+    readers always see one consistent version. The search index is brought
+    up to date in the same step, with no await in between.
+
+    Every change to the exercises bumps the revision in catalogue_state.
+    Each worker polls that one document and reloads when it moves, so edits
+    reach every process without Redis; with Redis the "catalogue"
+    invalidation gets there sooner.
+    """
+
+    def __init__(self, poll_seconds: float = 5):
+        self.poll_seconds = poll_seconds
+        self.snapshot = CatalogueSnapshot([])
+        self.search = SearchIndex()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def revision(self) -> int:
+        return self.snapshot.revision
+
+    async def stored_revision(self, db) -> int:
+        state = await db.catalogue_state.find_one({"_id": STATE_ID}, {"revision": 1})
+        return state["revision"] if state else 0
+
+    async def bump(self, db) -> int:
+        """Record that the exercises changed; call after the write."""
+        state = await db.catalogue_state.find_one_and_update(
+            {"_id": STATE_ID},
+            {"$inc": {"revision": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return state["revision"]
+
+    async def reload(self, db) -> CatalogueSnapshot:
+        async with self._lock:
+            # Revision first: a change that lands while the exercises are read bumps it
+            # again, and the next poll picks that up
+            revision = await self.stored_revision(db)
+            exercises = await db.exercises.find({}, {"_id": 0}).to_list(None)
+            for ex in exercises:
+                # Stored levels may be enum members depending on how they were written.
+                ex["level"] = getattr(ex["level"], "value", ex["level"])
+            self.snapshot = CatalogueSnapshot(exercises, revision)
+            self.search.sync(exercises)
+            return self.snapshot
+
+    async def refresh(self, db) -> bool:
+        """Reload if another worker changed the catalogue since our snapshot."""
+        if await self.stored_revision(db) <= self.revision:
+            return False
+        await self.reload(db)
+        return True
+
+    async def _poll(self, db) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.refresh(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Catalogue revision check failed: %s", e)
+
+    def start(self, db) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll(db))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def level(self, level: str) -> Tuple[bytes, str]:
+        return self.snapshot.by_level.get(level, EMPTY_LEVEL)
+
+    def get(self, exercise_id: str) -> Optional[dict]:
+        return self.snapshot.by_id.get(exercise_id)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
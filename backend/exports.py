@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, Callable, List, Optional, Sequence
+
+EXPORT_BATCH_SIZE = 500
+
+# Exportable fields in column order; all of them unless the request picks some
+USER_FIELDS = [
+    "id", "username", "email", "status", "payment_status", "created_at",
+    "timezone", "total_stars", "stars_day",
+]
+HISTORY_FIELDS = ["user_id", "day", "completed", "stars", "exercise_ids"]
+PROGRESS_FIELDS = ["user_id", "exercise_id", "day", "completed_date", "stars_earned"]
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def parse_fields(requested: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """Columns for ``fields=a,b,c``; all allowed fields when nothing is asked for."""
+    if not requested:
+        return list(allowed)
+    fields = [field.strip() for field in requested.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}; choose from {', '.join(allowed)}")
+    return list(dict.fromkeys(fields))
+
+
+def projection(fields: Sequence[str]) -> dict:
+    return {"_id": 0, **{field: 1 for field in fields}}
+
+
+def day_range(start: Optional[date], end: Optional[date]) -> dict:
+    """Filter on the "YYYY-MM-DD" day keys, both ends inclusive."""
+    query = {}
+    if start is not None:
+        query["$gte"] = start.isoformat()
+    if end is not None:
+        query["$lte"] = end.isoformat()
+    return query
+
+
+def datetime_range(start: Optional[date], end: Optional[date]) -> dict:
+    """Filter on naive UTC datetimes covering whole days, both ends inclusive."""
+    query = {}
+    if start is not None:
+        query["$gte"] = datetime.combine(start, time(0))
+    if end is not None:
+        query["$lt"] = datetime.combine(end + timedelta(days=1), time(0))
+    return query
+
+
+# A cell starting with one of these is run as a formula by spreadsheet apps
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        value = ";".join(str(item) for item in value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Member-chosen text such as a username of "=HYPERLINK(...)" must stay text
+        return "'" + value
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def stream_rows(
+    cursor,
+    fields: Sequence[str],
+    fmt: str,
+    transform: Optional[Callable[[dict], dict]] = None,
+) -> AsyncIterator[str]:
+    """Encode documents from ``cursor`` as CSV or NDJSON, one chunk per batch.
+
+    Only one batch is held at a time, so memory stays flat however large the
+    export, and every chunk hands control back to the event loop.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(fields)
+    rows = 0
+    async for doc in cursor:
+        if transform is not None:
+            doc = transform(doc)
+        if writer is not None:
+            writer.writerow([_csv_value(doc.get(field)) for field in fields])
+        else:
+            buffer.write(json.dumps({field: doc.get(field) for field in fields}, default=_json_default))
+            buffer.write("\n")
+        rows += 1
+        if rows % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def filename(kind: str, fmt: str) -> str:
+    return f"silvergym-{kind}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{fmt}"
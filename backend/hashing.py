@@ -0,0 +1,118 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordPoolSaturated(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a bounded thread or process pool.
+
+    At most ``workers`` jobs run at once; further callers wait for a slot.
+    When ``max_queue`` callers are already waiting, new ones are rejected
+    with ``PasswordPoolSaturated`` instead of queueing (0 disables shedding).
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 64, mode: str = "thread", retry_after: int = 2):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown password pool mode: {mode}")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.mode = mode
+        self.retry_after = retry_after
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        # Called with the seconds each job waited for a worker
+        self.on_queue_wait: Optional[Callable[[float], None]] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        if self.max_queue and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise PasswordPoolSaturated(self.retry_after)
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            waited = time.perf_counter() - queued_at
+            self.queue_seconds_total += waited
+            self.queue_seconds_max = max(self.queue_seconds_max, waited)
+            if self.on_queue_wait is not None:
+                self.on_queue_wait(waited)
+            self.running += 1
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_seconds_avg": self.queue_seconds_total / self.completed if self.completed else 0.0,
+            "queue_seconds_max": self.queue_seconds_max,
+        }
+
+
+def hasher_from_env() -> PasswordHasher:
+    return PasswordHasher(
+        workers=int(os.environ.get('PASSWORD_WORKERS', min(4, os.cpu_count() or 1))),
+        max_queue=int(os.environ.get('PASSWORD_MAX_QUEUE', '64')),
+        mode=os.environ.get('PASSWORD_POOL_MODE', 'thread'),
+        retry_after=int(os.environ.get('PASSWORD_RETRY_AFTER', '2')),
+    )
@@ -0,0 +1,162 @@
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Raw progress rows are kept this long; archived per-day totals live in progress_history.
+PROGRESS_RETENTION_DAYS = int(os.environ.get('PROGRESS_RETENTION_DAYS', '35'))
+
+# Declared indexes, keyed by collection. Each entry is (name, keys, options).
+INDEXES: Dict[str, List[Tuple[str, list, dict]]] = {
+    "users": [
+        ("users_id_unique", [("id", ASCENDING)], {"unique": True}),
+        ("users_username_unique", [("username", ASCENDING)], {"unique": True}),
+        ("users_email_unique", [("email", ASCENDING)], {"unique": True}),
+        ("users_created_id", [("created_at", ASCENDING), ("id", ASCENDING)], {}),
+        ("users_timezone_stars_day", [("timezone", ASCENDING), ("stars_day", ASCENDING)], {}),
+    ],
+    "progress": [
+        ("progress_day", [("day", ASCENDING)], {}),
+        (
+            "progress_completed_ttl",
+            [("completed_date", ASCENDING)],
+            {"expireAfterSeconds": PROGRESS_RETENTION_DAYS * 86400},
+        ),
+        # Rows written before the day bucket existed have no "day" and are left out.
+        (
+            "progress_user_exercise_day_unique",
+            [("user_id", ASCENDING), ("exercise_id", ASCENDING), ("day", ASCENDING)],
+            {"unique": True, "partialFilterExpression": {"day": {"$exists": True}}},
+        ),
+        # Only rows whose award the reconciliation sweep has not confirmed yet: a few minutes' worth
+        (
+            "progress_award_pending",
+            [("completed_date", ASCENDING)],
+            {"partialFilterExpression": {"award_pending": True}},
+        ),
+    ],
+    "progress_history": [
+        ("history_user_day_unique", [("user_id", ASCENDING), ("day", ASCENDING)], {"unique": True}),
+        ("history_day", [("day", ASCENDING)], {}),
+    ],
+    "progress_totals": [
+        ("totals_user_unique", [("user_id", ASCENDING)], {"unique": True}),
+    ],
+    "token_revocations": [
+        # Revocations are only needed while the tokens they cover can still be valid
+        ("revocations_revoked_at_ttl", [("revoked_at", ASCENDING)], {"expireAfterSeconds": 24 * 3600}),
+    ],
+    "leaderboard_entries": [
+        (
+            "leaderboard_board_level_user_unique",
+            [("board", ASCENDING), ("level", ASCENDING), ("user_id", ASCENDING)],
+            {"unique": True},
+        ),
+        (
+            # Ties rank by user_id descending, the order Redis sorted sets use
+            "leaderboard_board_level_rank_desc",
+            [("board", ASCENDING), ("level", ASCENDING), ("stars", DESCENDING), ("user_id", DESCENDING)],
+            {},
+        ),
+        ("leaderboard_user", [("user_id", ASCENDING)], {}),
+        # Daily and weekly entries carry expires_at; all-time entries have none and are kept
+        ("leaderboard_expires_ttl", [("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+    "admin_jobs": [
+        ("admin_jobs_status_created", [("status", ASCENDING), ("created_at", ASCENDING)], {}),
+        # Only finished jobs have finished_at; queued and running ones are kept until they end
+        ("admin_jobs_finished_ttl", [("finished_at", ASCENDING)], {"expireAfterSeconds": 7 * 86400}),
+    ],
+    "job_runs": [
+        ("job_runs_started_ttl", [("started_at", ASCENDING)], {"expireAfterSeconds": 90 * 86400}),
+    ],
+    "exercises": [
+        ("exercises_level", [("level", ASCENDING)], {}),
+    ],
+}
+
+# Queries issued by the hot routes. Each must be answered by an index.
+HOT_QUERIES = [
+    ("get_current_user", "users", {"id": "x"}),
+    ("signup", "users", {"$or": [{"username": "x"}, {"email": "x@example.com"}]}),
+    ("login", "users", {"username": "x"}),
+    ("get_exercises", "exercises", {"level": "beginner"}),
+    ("complete_exercise", "progress", {"user_id": "x", "exercise_id": "x", "day": "2024-01-01"}),
+    ("get_user_dashboard", "progress_history", {"user_id": "x", "day": "2024-01-01"}),
+    ("check_daily_summaries", "progress", {"day": "2024-01-01"}),
+    ("reconcile_awards", "progress", {"award_pending": True, "completed_date": {"$lt": datetime(2024, 1, 1)}}),
+    ("get_user_history", "progress_history", {"user_id": "x", "day": {"$gte": "2024-01-01", "$lte": "2024-01-31"}}),
+    ("get_user_streaks", "progress_totals", {"user_id": "x"}),
+    ("leaderboard", "leaderboard_entries", {"board": "all_time", "level": "all"}),
+    ("daily_rollover", "users", {"timezone": "UTC", "stars_day": {"$lt": "2024-01-01"}, "total_stars": {"$gt": 0}}),
+]
+
+
+def _comparable(info: dict) -> tuple:
+    return (
+        [(field, int(direction)) for field, direction in info["key"]],
+        bool(info.get("unique", False)),
+        info.get("expireAfterSeconds"),
+        info.get("partialFilterExpression"),
+    )
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create every declared index and return a drift report.
+
+    The report has three lists: ``created`` (declared and newly built),
+    ``mismatched`` (an index with the declared name exists with other keys or
+    options, or could not be built) and ``undeclared`` (present in the
+    database but not declared here).
+    """
+    report = {"created": [], "mismatched": [], "undeclared": []}
+    for collection, specs in INDEXES.items():
+        existing = await db[collection].index_information()
+        declared_names = set()
+        for name, keys, options in specs:
+            declared_names.add(name)
+            wanted = _comparable({"key": keys, **options})
+            if name in existing:
+                if _comparable(existing[name]) != wanted:
+                    report["mismatched"].append(f"{collection}.{name}")
+                continue
+            try:
+                await db[collection].create_index(keys, name=name, **options)
+                report["created"].append(f"{collection}.{name}")
+            except OperationFailure as e:
+                # Usually duplicate data blocking a unique index; keep serving.
+                logger.error("Could not create index %s.%s: %s", collection, name, e)
+                report["mismatched"].append(f"{collection}.{name}")
+        for name in existing:
+            if name != "_id_" and name not in declared_names:
+                report["undeclared"].append(f"{collection}.{name}")
+
+    if report["mismatched"] or report["undeclared"]:
+        logger.warning("Index drift detected: %s", report)
+    return report
+
+
+def _plan_stages(plan: dict):
+    yield plan.get("stage")
+    if "inputStage" in plan:
+        yield from _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+async def find_collscans(db) -> List[str]:
+    """Explain every hot query and return the names of those that scan a whole collection."""
+    offenders = []
+    for route, collection, query in HOT_QUERIES:
+        explain = await db.command({"explain": {"find": collection, "filter": query}, "verbosity": "queryPlanner"})
+        winning = explain["queryPlanner"]["winningPlan"]
+        # Slot-based engine wraps the classic plan in queryPlan.
+        winning = winning.get("queryPlan", winning)
+        if "COLLSCAN" in _plan_stages(winning):
+            offenders.append(route)
+    return offenders
@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+# Seconds to wait before each retry of recording a job's outcome
+FINISH_RETRY_DELAYS = (0.5, 2, 5)
+
+
+class LeaseLost(Exception):
+    """The job was reclaimed by another worker; this one must stop touching it."""
+
+
+class JobContext:
+    """What a handler sees of its job: params, saved checkpoint and batch helpers.
+
+    Handlers must be resumable: after a restart the job runs again from the
+    start with the checkpoint it last saved, so every step either records its
+    position or is naturally idempotent (e.g. "delete what is left").
+    Every write is fenced by the lease of this claim: once another worker has
+    taken the job over, ``save`` raises LeaseLost.
+    """
+
+    def __init__(self, queue: "JobQueue", db, job: dict):
+        self.queue = queue
+        self.db = db
+        self.job_id = job["_id"]
+        self.lease = job["lease"]
+        self.lease_lost = False
+        self.params = job.get("params", {})
+        self.checkpoint = job.get("checkpoint") or {}
+        self.processed = job.get("processed", 0)
+        self.total = job.get("total")
+
+    async def save(
+        self,
+        processed: Optional[int] = None,
+        total: Optional[int] = None,
+        checkpoint: Optional[dict] = None,
+        append: Optional[Dict[str, list]] = None,
+    ) -> None:
+        """Record progress and extend the lease; ``checkpoint`` keys are merged, ``append`` lists pushed."""
+        update = {"$set": {"lease_expires_at": self.queue.lease_deadline()}}
+        if processed is not None:
+            self.processed = processed
+            update["$set"]["processed"] = processed
+        if total is not None:
+            self.total = total
+            update["$set"]["total"] = total
+        for key, value in (checkpoint or {}).items():
+            self.checkpoint[key] = value
+            update["$set"][f"checkpoint.{key}"] = value
+        if append:
+            update["$push"] = {}
+            for key, values in append.items():
+                self.checkpoint.setdefault(key, []).extend(values)
+                update["$push"][f"checkpoint.{key}"] = {"$each": values}
+        result = await self.db.admin_jobs.update_one({"_id": self.job_id, "lease": self.lease}, update)
+        if result.matched_count == 0:
+            self.lease_lost = True
+            raise LeaseLost(f"Admin job {self.job_id} was reclaimed by another worker")
+
+    async def renew(self) -> bool:
+        """Extend the lease without recording progress; False once it has been lost."""
+        result = await self.db.admin_jobs.update_one(
+            {"_id": self.job_id, "lease": self.lease}, {"$set": {"lease_expires_at": self.queue.lease_deadline()}}
+        )
+        if result.matched_count == 0:
+            self.lease_lost = True
+        return not self.lease_lost
+
+    async def pause(self) -> None:
+        # Give member requests a turn between batches
+        await asyncio.sleep(self.queue.batch_pause)
+        if self.lease_lost:
+            raise LeaseLost(f"Admin job {self.job_id} was reclaimed by another worker")
+
+    async def run_steps(self, steps: List[Callable[[], Awaitable]]) -> None:
+        """Run ``steps`` in order, skipping the ones finished before a restart."""
+        for index, step in enumerate(steps):
+            if index < self.checkpoint.get("step", 0):
+                continue
+            await step()
+            await self.save(checkpoint={"step": index + 1})
+
+    async def delete_batches(self, collection, query: dict) -> int:
+        deleted = 0
+        while True:
+            ids = [doc["_id"] async for doc in collection.find(query, {"_id": 1}).limit(self.queue.batch_size)]
+            if not ids:
+                return deleted
+            result = await collection.delete_many({"_id": {"$in": ids}})
+            deleted += result.deleted_count
+            await self.save(processed=self.processed + len(ids))
+            await self.pause()
+
+    async def update_batches(self, collection, query: dict, update: dict) -> int:
+        """Apply ``update`` batch by batch; ``query`` must stop matching a document once it is updated."""
+        modified = 0
+        while True:
+            ids = [doc["_id"] async for doc in collection.find(query, {"_id": 1}).limit(self.queue.batch_size)]
+            if not ids:
+                return modified
+            result = await collection.update_many({"_id": {"$in": ids}, **query}, update)
+            modified += result.modified_count
+            await self.save(processed=self.processed + len(ids))
+            await self.pause()
+
+
+JobHandler = Callable[[JobContext], Awaitable[dict]]
+
+
+class JobQueue:
+    """Persistent queue for heavy admin operations, stored in ``admin_jobs``.
+
+    Every process runs a few worker coroutines. A worker claims the oldest
+    queued job, or a running one whose lease lapsed because its worker died,
+    with a single find_one_and_update. Each claim gets its own lease token,
+    renewed whenever the handler saves progress and by a heartbeat while it
+    runs, so a long step keeps its lease and a worker whose job was taken
+    over stops instead of racing the new owner. Work is done in throttled
+    batches so member traffic on the same event loop keeps flowing.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        batch_size: int = 1000,
+        batch_pause: float = 0.05,
+        lease_seconds: float = 60,
+        poll_seconds: float = 2,
+        max_attempts: int = 3,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.handlers: Dict[str, JobHandler] = {}
+        self._wake = asyncio.Event()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self.handlers[kind] = handler
+
+    def lease_deadline(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+
+    async def enqueue(self, db, kind: str, params: dict) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"No handler for job kind {kind!r}")
+        job_id = str(uuid.uuid4())
+        await db.admin_jobs.insert_one({
+            "_id": job_id,
+            "kind": kind,
+            "params": params,
+            "status": "queued",
+            "processed": 0,
+            "total": None,
+            "attempts": 0,
+            "created_at": datetime.utcnow(),
+        })
+        self._wake.set()
+        return job_id
+
+    async def claim(self, db) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await db.admin_jobs.find_one_and_update(
+            {"$or": [{"status": "queued"}, {"status": "running", "lease_expires_at": {"$lt": now}}]},
+            {
+                "$set": {
+                    "status": "running",
+                    "worker": self.worker_id,
+                    "lease": uuid.uuid4().hex,
+                    "lease_expires_at": self.lease_deadline(),
+                },
+                "$min": {"started_at": now},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _finish(self, db, job: dict, outcome: dict) -> None:
+        outcome["finished_at"] = datetime.utcnow()
+        for delay in FINISH_RETRY_DELAYS + (None,):
+            try:
+                result = await db.admin_jobs.update_one({"_id": job["_id"], "lease": job["lease"]}, {"$set": outcome})
+                break
+            except Exception as e:
+                if delay is None:
+                    raise
+                logger.warning("Recording the outcome of admin job %s failed, retrying: %s", job["_id"], e)
+                await asyncio.sleep(delay)
+        if result.matched_count == 0:
+            logger.warning("Admin job %s was reclaimed before it finished here; leaving it to its new owner", job["_id"])
+
+    async def _heartbeat(self, ctx: JobContext, task: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await ctx.renew()
+            except Exception as e:
+                logger.warning("Renewing the lease of admin job %s failed: %s", ctx.job_id, e)
+                continue
+            if not renewed:
+                task.cancel()
+                return
+
+    async def execute(self, db, job: dict) -> None:
+        if job["attempts"] > self.max_attempts:
+            # Its worker died this many times; running it again would likely do the same
+            await self._finish(db, job, {"status": "failed", "error": f"Gave up after {self.max_attempts} attempts"})
+            return
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            await self._finish(db, job, {"status": "failed", "error": f"No handler for job kind {job['kind']!r}"})
+            return
+        if job["attempts"] > 1:
+            logger.info("Resuming admin job %s (%s), attempt %d", job["_id"], job["kind"], job["attempts"])
+        ctx = JobContext(self, db, job)
+        task = asyncio.ensure_future(handler(ctx))
+        heartbeat = asyncio.create_task(self._heartbeat(ctx, task))
+        try:
+            result = await task
+            outcome = {"status": "succeeded", "result": result}
+        except LeaseLost:
+            logger.warning("Admin job %s (%s) lost its lease; stopping", job["_id"], job["kind"])
+            return
+        except asyncio.CancelledError:
+            if not ctx.lease_lost:
+                raise
+            logger.warning("Admin job %s (%s) lost its lease; stopping", job["_id"], job["kind"])
+            return
+        except Exception as e:
+            logger.exception("Admin job %s (%s) failed", job["_id"], job["kind"])
+            outcome = {"status": "failed", "error": str(e)}
+        finally:
+            heartbeat.cancel()
+        await self._finish(db, job, outcome)
+
+    async def _worker(self, db) -> None:
+        while True:
+            try:
+                job = await self.claim(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Claiming an admin job failed: %s", e)
+                job = None
+            if job is not None:
+                try:
+                    await self.execute(db, job)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    # The job keeps its lease and checkpoint and is picked up again once the lease lapses
+                    logger.exception("Admin job %s (%s) was interrupted", job["_id"], job["kind"])
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, db) -> None:
+        if self._tasks:
+            return
+        for _ in range(self.workers):
+            self._tasks.add(asyncio.create_task(self._worker(db)))
+
+    async def stop(self) -> None:
+        # Interrupted jobs keep their lease and checkpoint; they resume once the lease lapses
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+    async def get(self, db, job_id: str) -> Optional[dict]:
+        job = await db.admin_jobs.find_one({"_id": job_id}, {"checkpoint": 0, "lease": 0})
+        if job is not None:
+            job["id"] = job.pop("_id")
+        return job
+
+    async def wait(self, db, job_id: str, timeout: float) -> Optional[dict]:
+        """The job's state once it finished, or as it stands after ``timeout`` seconds."""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            job = await self.get(db, job_id)
+            if job is None or job["status"] in TERMINAL_STATUSES or asyncio.get_running_loop().time() >= deadline:
+                return job
+            await asyncio.sleep(0.05)
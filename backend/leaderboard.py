@@ -0,0 +1,243 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from summaries import AWARD_MEMORY
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("daily", "weekly", "all_time")
+ALL_LEVELS = "all"
+REDIS_PREFIX = "silvergym:leaderboard:"
+# Daily and weekly boards are dropped a little after their period ends
+RETENTION = {"daily": timedelta(days=2), "weekly": timedelta(days=9)}
+REBUILD_BATCH = 1000
+# Past this many members ahead, Mongo reports a rank as "beyond" instead of counting further
+RANK_COUNT_LIMIT = 10000
+
+
+def board_key(period: str, day: str) -> str:
+    """Board a completion on ``day`` (the member's local day) counts towards."""
+    if period == "daily":
+        return f"daily:{day}"
+    if period == "weekly":
+        year, week, _ = datetime.strptime(day, "%Y-%m-%d").isocalendar()
+        return f"weekly:{year}-W{week:02d}"
+    return "all_time"
+
+
+class Leaderboard:
+    """Star rankings per period and exercise level, updated as stars are awarded.
+
+    ``leaderboard_entries`` holds one document per (board, level, user_id) and
+    is indexed on (board, level, stars desc, user_id desc), so the top N is an
+    index walk. A member's rank there is a count of the index keys ahead of
+    them, which costs O(rank); it stops at ``rank_count_limit`` and deeper
+    members get ``{"rank": None, "rank_beyond": limit}`` instead. With Redis
+    configured every board is mirrored in a sorted set and ranks come from
+    ZREVRANK in O(log n) at any depth; Mongo stays the durable copy the sets
+    are rebuilt from. Equal scores order by user_id descending on both
+    backends, as sorted sets do, so a board ranks the same either way.
+    """
+
+    def __init__(self, redis=None, rank_count_limit: int = RANK_COUNT_LIMIT):
+        self.redis = redis
+        self.rank_count_limit = rank_count_limit
+
+    def _redis_key(self, board: str, level: str) -> str:
+        return f"{REDIS_PREFIX}{board}:{level}"
+
+    async def record(
+        self, db, user_id: str, day: str, stars: int, stars_by_level: Dict[str, int], award: Optional[str] = None
+    ) -> None:
+        """Add an award's stars to every board it counts towards.
+
+        Entries list their recent awards and skip one they already hold, so
+        recording the same ``award`` again changes nothing. The sorted sets
+        then take the resulting Mongo scores rather than an increment of
+        their own, so a retry cannot count twice there either.
+        """
+        award = award or str(uuid.uuid4())
+        increments = {ALL_LEVELS: stars, **stars_by_level}
+        now = datetime.utcnow()
+        ops, keys = [], []
+        for period in PERIODS:
+            board = board_key(period, day)
+            on_insert = {"expires_at": now + RETENTION[period]} if period in RETENTION else {}
+            for level, earned in increments.items():
+                if not earned:
+                    continue
+                ops.append(UpdateOne(
+                    {"board": board, "level": level, "user_id": user_id, "awards": {"$ne": award}},
+                    {
+                        "$inc": {"stars": earned},
+                        "$push": {"awards": {"$each": [award], "$slice": -AWARD_MEMORY}},
+                        "$setOnInsert": on_insert,
+                    },
+                    upsert=True,
+                ))
+                keys.append((board, level))
+        if not ops:
+            return
+        try:
+            await db.leaderboard_entries.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            # The entry exists: it already holds this award, or two first completions raced on the unique index
+            retry = []
+            for error in e.details["writeErrors"]:
+                if error["code"] != 11000:
+                    raise
+                retry.append(ops[error["index"]])
+            try:
+                await db.leaderboard_entries.bulk_write(retry, ordered=False)
+            except BulkWriteError as e:
+                # Still there after the race settled: the award was counted before
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                    raise
+
+        if self.redis is not None:
+            try:
+                query = {"user_id": user_id, "board": {"$in": [board for board, _ in keys]}}
+                scores = {
+                    (entry["board"], entry["level"]): entry["stars"]
+                    async for entry in db.leaderboard_entries.find(query, {"_id": 0, "board": 1, "level": 1, "stars": 1})
+                }
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for board, level in keys:
+                        if (board, level) not in scores:
+                            continue
+                        key = self._redis_key(board, level)
+                        # Scores only grow between clears; GT keeps a late, older read from lowering one
+                        pipe.zadd(key, {user_id: scores[(board, level)]}, gt=True)
+                        period = board.split(":", 1)[0]
+                        if period in RETENTION:
+                            pipe.expire(key, int(RETENTION[period].total_seconds()))
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning("Leaderboard update in Redis failed for %s: %s", user_id, e)
+
+    async def recorded(self, db, awards: List[Tuple[str, str, str]]) -> Set[str]:
+        """Which of ``(user_id, day, award)`` every board of that day already counts.
+
+        The all-levels entries stand for the award: the per-level ones are
+        written by the same bulk_write.
+        """
+        boards = {board_key(period, day) for _, day, _ in awards for period in PERIODS}
+        query = {"user_id": {"$in": list({user_id for user_id, _, _ in awards})}, "board": {"$in": list(boards)}, "level": ALL_LEVELS}
+        held = {
+            (entry["user_id"], entry["board"]): set(entry.get("awards", []))
+            async for entry in db.leaderboard_entries.find(query, {"_id": 0, "user_id": 1, "board": 1, "awards": 1})
+        }
+        return {
+            award for user_id, day, award in awards
+            if all(award in held.get((user_id, board_key(period, day)), ()) for period in PERIODS)
+        }
+
+    async def _ranking_from_redis(self, board: str, level: str, user_id: str, limit: int):
+        key = self._redis_key(board, level)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrange(key, 0, limit - 1, withscores=True)
+            pipe.zrevrank(key, user_id)
+            pipe.zscore(key, user_id)
+            top, rank, score = await pipe.execute()
+        me = {"rank": rank + 1, "stars": int(score)} if rank is not None else None
+        return [(member, int(stars)) for member, stars in top], me
+
+    async def _ranking_from_mongo(self, db, board: str, level: str, user_id: str, limit: int):
+        query = {"board": board, "level": level}
+        cursor = db.leaderboard_entries.find(query, {"_id": 0, "user_id": 1, "stars": 1})
+        cursor = cursor.sort([("stars", DESCENDING), ("user_id", DESCENDING)]).limit(limit)
+        top = [(entry["user_id"], entry["stars"]) async for entry in cursor]
+        mine = await db.leaderboard_entries.find_one({**query, "user_id": user_id}, {"_id": 0, "stars": 1})
+        if mine is None:
+            return top, None
+        ahead = await db.leaderboard_entries.count_documents({**query, "$or": [
+            {"stars": {"$gt": mine["stars"]}},
+            {"stars": mine["stars"], "user_id": {"$gt": user_id}},
+        ]}, limit=self.rank_count_limit)
+        if ahead >= self.rank_count_limit:
+            return top, {"rank": None, "rank_beyond": self.rank_count_limit, "stars": mine["stars"]}
+        return top, {"rank": ahead + 1, "stars": mine["stars"]}
+
+    async def ranking(self, db, period: str, level: Optional[str], day: str, user_id: str, limit: int) -> dict:
+        board = board_key(period, day)
+        level = level or ALL_LEVELS
+        top: List[Tuple[str, int]] = []
+        me = None
+        if self.redis is not None:
+            try:
+                top, me = await self._ranking_from_redis(board, level, user_id, limit)
+            except Exception as e:
+                logger.warning("Leaderboard read from Redis failed, using Mongo: %s", e)
+                top, me = await self._ranking_from_mongo(db, board, level, user_id, limit)
+        else:
+            top, me = await self._ranking_from_mongo(db, board, level, user_id, limit)
+
+        names = {}
+        if top:
+            async for user in db.users.find({"id": {"$in": [uid for uid, _ in top]}}, {"_id": 0, "id": 1, "username": 1}):
+                names[user["id"]] = user["username"]
+        return {
+            "period": period,
+            "level": level,
+            "board": board,
+            "top": [
+                {"rank": i + 1, "username": names.get(uid), "stars": stars, "is_me": uid == user_id}
+                for i, (uid, stars) in enumerate(top)
+            ],
+            "me": me,
+        }
+
+    async def remove_user(self, db, user_id: str) -> None:
+        await db.leaderboard_entries.delete_many({"user_id": user_id})
+        if self.redis is not None:
+            try:
+                async for key in self.redis.scan_iter(match=f"{REDIS_PREFIX}*", count=1000):
+                    await self.redis.zrem(key, user_id)
+            except Exception as e:
+                logger.warning("Leaderboard removal in Redis failed for %s: %s", user_id, e)
+
+    async def clear_redis(self) -> None:
+        # The Mongo entries are deleted in batches by the clear_workout_data job
+        if self.redis is not None:
+            try:
+                async for key in self.redis.scan_iter(match=f"{REDIS_PREFIX}*", count=1000):
+                    await self.redis.unlink(key)
+            except Exception as e:
+                logger.warning("Leaderboard clear in Redis failed: %s", e)
+
+    async def rebuild_redis(self, db, force: bool = False) -> int:
+        """Load the sorted sets from Mongo, e.g. after Redis lost its data.
+
+        Without ``force`` nothing happens while the all-time board exists.
+        """
+        if self.redis is None:
+            return 0
+        if not force and await self.redis.exists(self._redis_key("all_time", ALL_LEVELS)):
+            return 0
+        now = datetime.utcnow()
+        loaded = 0
+        batch: Dict[str, Dict[str, int]] = {}
+
+        async def flush():
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, members in batch.items():
+                    pipe.zadd(key, members)
+                    if not key.startswith(f"{REDIS_PREFIX}all_time:"):
+                        pipe.expire(key, int(max(RETENTION.values()).total_seconds()))
+                await pipe.execute()
+            batch.clear()
+
+        query = {"$or": [{"expires_at": {"$exists": False}}, {"expires_at": {"$gt": now}}]}
+        async for entry in db.leaderboard_entries.find(query, {"_id": 0}, batch_size=REBUILD_BATCH):
+            batch.setdefault(self._redis_key(entry["board"], entry["level"]), {})[entry["user_id"]] = entry["stars"]
+            loaded += 1
+            if loaded % REBUILD_BATCH == 0:
+                await flush()
+        if batch:
+            await flush()
+        return loaded
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+WATCHED_COLLECTIONS = ["users", "progress", "token_revocations"]
+CHANGE_STREAM_PIPELINE = [
+    {"$match": {
+        "ns.coll": {"$in": WATCHED_COLLECTIONS},
+        "operationType": {"$in": ["insert", "update", "replace"]},
+    }},
+]
+# Never leaves the server, whatever the source; awards is star bookkeeping
+PRIVATE_USER_FIELDS = ("_id", "password_hash", "awards")
+
+
+def user_event(user: dict, op: str = "upsert") -> dict:
+    """A whole or partial user document to merge into the admin's list (always carries "id")."""
+    return {"type": "user", "op": op, "user": {k: v for k, v in user.items() if k not in PRIVATE_USER_FIELDS}}
+
+
+def completion_event(user_id: str, exercise_ids: List[str], stars: int) -> dict:
+    return {"type": "completion", "user_id": user_id, "exercise_ids": list(exercise_ids), "stars": stars}
+
+
+def resync_event() -> dict:
+    """Too much changed to describe; clients reload their data."""
+    return {"type": "resync"}
+
+
+def _key(event: dict) -> str:
+    if event["type"] == "user":
+        return f"user:{event['user']['id']}"
+    if event["type"] == "completion":
+        return f"completion:{event['user_id']}"
+    return event["type"]
+
+
+def _merge(old: dict, new: dict) -> dict:
+    if new["type"] == "completion":
+        return {**new, "exercise_ids": old["exercise_ids"] + new["exercise_ids"], "stars": old["stars"] + new["stars"]}
+    if new["type"] == "user" and new["op"] == "upsert" and old["op"] == "upsert":
+        return {**new, "user": {**old["user"], **new["user"]}}
+    return new
+
+
+class Subscription:
+    """One admin connection: pending events coalesced per member, bounded in size.
+
+    Events for the same member merge while the consumer is busy, so a burst
+    costs one message per member. A consumer that falls more than
+    ``max_pending`` members behind loses its backlog and gets a resync.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[str, dict]" = OrderedDict()
+        self.overflowed = False
+        self.ready = asyncio.Event()
+
+    def offer(self, event: dict) -> None:
+        if self.overflowed:
+            return
+        key = _key(event)
+        if key in self.pending:
+            self.pending[key] = _merge(self.pending[key], event)
+        elif len(self.pending) >= self.max_pending or event["type"] == "resync":
+            self.pending.clear()
+            self.overflowed = True
+        else:
+            self.pending[key] = event
+        self.ready.set()
+
+    def drain(self) -> Tuple[List[dict], bool]:
+        events, overflowed = list(self.pending.values()), self.overflowed
+        self.pending.clear()
+        self.overflowed = False
+        self.ready.clear()
+        return events, overflowed
+
+
+class LiveEvents:
+    """Fan-out of admin-visible changes to every open live connection.
+
+    With a replica set the events come from a change stream on users,
+    progress and token_revocations, so writes made by any worker are seen.
+    Otherwise the routes feed the bus directly through ``emit`` and each
+    worker only reports its own writes.
+    """
+
+    def __init__(self, max_pending: int = 1000, user_transform: Optional[Callable[[dict], dict]] = None):
+        self.max_pending = max_pending
+        self.user_transform = user_transform or (lambda user: user)
+        self.subscriptions: Set[Subscription] = set()
+        self.source = "routes"
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.max_pending)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscriptions.discard(subscription)
+
+    def publish(self, event: dict) -> None:
+        for subscription in self.subscriptions:
+            subscription.offer(event)
+
+    def emit(self, event: dict) -> None:
+        # The change stream reports the same write; do not announce it twice
+        if self.source == "routes":
+            self.publish(event)
+
+    def _from_change(self, change: dict, revoke_all: int) -> Optional[dict]:
+        collection = change["ns"]["coll"]
+        document = change.get("fullDocument")
+        if document is None:
+            return None
+        if collection == "users":
+            return user_event(self.user_transform(document))
+        if collection == "progress" and change["operationType"] == "insert":
+            return completion_event(document["user_id"], [document["exercise_id"]], document.get("stars_earned", 1))
+        if collection == "token_revocations" and document.get("version") == revoke_all:
+            # A deleted user's document is gone; its revocation entry still names it
+            return user_event({"id": document["user_id"]}, op="delete")
+        return None
+
+    async def _watch(self, db, revoke_all: int) -> None:
+        resume_token = None
+        while True:
+            opened = False
+            try:
+                async with db.watch(CHANGE_STREAM_PIPELINE, full_document="updateLookup", resume_after=resume_token) as stream:
+                    opened = True
+                    if self.source != "change_stream":
+                        logger.info("Live admin events follow the change stream")
+                    self.source = "change_stream"
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        event = self._from_change(change, revoke_all)
+                        if event is not None:
+                            self.publish(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.source != "change_stream":
+                    logger.info("Change streams unavailable (%s); live admin events come from the routes", e)
+                    return
+                logger.warning("Change stream interrupted, resuming: %s", e)
+                if not opened:
+                    # The resume point itself was refused (e.g. aged out of the oplog); start afresh
+                    resume_token = None
+                # Whatever happened during the gap is unknown to the clients
+                self.publish(resync_event())
+                await asyncio.sleep(1)
+
+    def start(self, db, revoke_all: int) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch(db, revoke_all))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
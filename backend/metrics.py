@@ -0,0 +1,122 @@
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from pymongo import monitoring
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "silvergym_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "silvergym_http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+PASSWORD_QUEUE_SECONDS = Histogram(
+    "silvergym_password_queue_seconds",
+    "Time a bcrypt job waited for a worker",
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    "silvergym_mongo_command_duration_seconds",
+    "MongoDB command latency by collection and operation",
+    ["collection", "command", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+DAILY_ROLLOVER_SECONDS = Histogram(
+    "silvergym_daily_rollover_duration_seconds",
+    "Duration of the nightly rollover job",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0),
+)
+DAILY_ROLLOVER_ROWS = Counter(
+    "silvergym_daily_rollover_rows_total",
+    "Documents written by the nightly rollover job",
+    ["operation"],
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def route_template(app, scope) -> str:
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+class PrometheusMiddleware:
+    """Times every HTTP request under its route template, not the raw path."""
+
+    def __init__(self, app, router_app):
+        self.app = app
+        self.router_app = router_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.router_app, scope)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            REQUEST_LATENCY.labels(method, route, str(status_code)).observe(time.perf_counter() - start)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records the latency of every command the driver sends."""
+
+    def __init__(self):
+        self._collections = {}
+
+    def _key(self, event):
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self._collections[self._key(event)] = target if isinstance(target, str) else ""
+
+    def _finish(self, event, outcome):
+        collection = self._collections.pop(self._key(event), "")
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name, outcome).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    # With several workers each one writes to PROMETHEUS_MULTIPROC_DIR and any of them can aggregate
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
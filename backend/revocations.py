@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Version used for deleted users: no token can reach it.
+REVOKE_ALL = 2 ** 31
+
+
+class TokenRevocations:
+    """In-memory view of revoked token versions, shared through Mongo.
+
+    A token carries the member's token_version at login. Revoking stores the
+    new minimum valid version locally and in ``token_revocations`` so other
+    processes pick it up on their next poll. Entries expire with the tokens.
+    """
+
+    def __init__(self, token_lifetime: timedelta):
+        self.token_lifetime = token_lifetime
+        # user_id -> (minimum valid version, when it was revoked)
+        self.min_versions: Dict[str, Tuple[int, datetime]] = {}
+        self._last_seen: Optional[datetime] = None
+
+    def is_revoked(self, user_id: str, version: int) -> bool:
+        entry = self.min_versions.get(user_id)
+        return entry is not None and version < entry[0]
+
+    def _apply(self, user_id: str, version: int, revoked_at: datetime) -> None:
+        current = self.min_versions.get(user_id)
+        if current is None or version > current[0]:
+            self.min_versions[user_id] = (version, revoked_at)
+
+    async def revoke(self, db, user_id: str, version: int) -> None:
+        revoked_at = datetime.utcnow()
+        self._apply(user_id, version, revoked_at)
+        await db.token_revocations.insert_one({"user_id": user_id, "version": version, "revoked_at": revoked_at})
+
+    async def revoke_many(self, db, versions: Dict[str, int]) -> None:
+        if not versions:
+            return
+        revoked_at = datetime.utcnow()
+        for user_id, version in versions.items():
+            self._apply(user_id, version, revoked_at)
+        await db.token_revocations.insert_many([
+            {"user_id": user_id, "version": version, "revoked_at": revoked_at} for user_id, version in versions.items()
+        ])
+
+    async def refresh(self, db) -> int:
+        now = datetime.utcnow()
+        since = self._last_seen or now - self.token_lifetime
+        # Small overlap so a write that lands while we read is not missed
+        query = {"revoked_at": {"$gte": since - timedelta(seconds=1)}}
+        count = 0
+        async for entry in db.token_revocations.find(query, {"_id": 0}):
+            self._apply(entry["user_id"], entry["version"], entry["revoked_at"])
+            count += 1
+        self._last_seen = now
+        # Every token issued before an old revocation has expired by now
+        cutoff = now - self.token_lifetime
+        self.min_versions = {uid: entry for uid, entry in self.min_versions.items() if entry[1] >= cutoff}
+        return count
+
+    async def poll_forever(self, db, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(db)
+            except Exception as e:
+                logger.error("Token revocation refresh failed: %s", e)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+LEASE_ID = "scheduler"
+
+
+def daily_at(hour: int, minute: int = 0, second: int = 0) -> Callable[[datetime], datetime]:
+    """Slot function for a job that runs once a day at a fixed UTC time."""
+    def slot_for(now: datetime) -> datetime:
+        slot = now.replace(hour=hour, minute=minute, second=second, microsecond=0)
+        return slot if slot <= now else slot - timedelta(days=1)
+    return slot_for
+
+
+def every(seconds: int) -> Callable[[datetime], datetime]:
+    """Slot function for a job that runs on a fixed interval aligned to the epoch."""
+    def slot_for(now: datetime) -> datetime:
+        epoch = datetime(1970, 1, 1)
+        elapsed = int((now - epoch).total_seconds())
+        return epoch + timedelta(seconds=elapsed - elapsed % seconds)
+    return slot_for
+
+
+class Job:
+    def __init__(self, name: str, slot_for: Callable[[datetime], datetime], run: Callable[[datetime], Awaitable]):
+        self.name = name
+        self.slot_for = slot_for
+        self.run = run
+
+
+class Scheduler:
+    """Runs registered jobs in exactly one process.
+
+    Processes compete for a lease document; only the holder runs jobs and it
+    renews the lease on every tick. Each job run is claimed by moving
+    ``scheduled_jobs.last_slot`` forward with a conditional update, so a slot
+    runs once even if two processes briefly both believe they lead. A slot
+    missed while nobody was leader (e.g. during a restart) is run as soon as a
+    leader sees it; older missed slots collapse into that one run.
+    """
+
+    def __init__(self, lease_seconds: float = 30, tick_seconds: float = 5):
+        self.db = None
+        self.lease_seconds = lease_seconds
+        self.tick_seconds = tick_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.jobs: Dict[str, Job] = {}
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, slot_for: Callable[[datetime], datetime], run: Callable[[datetime], Awaitable]) -> None:
+        self.jobs[name] = Job(name, slot_for, run)
+
+    async def acquire_lease(self, now: Optional[datetime] = None) -> bool:
+        now = now or datetime.utcnow()
+        try:
+            lease = await self.db.scheduler_leases.find_one_and_update(
+                {"_id": LEASE_ID, "$or": [{"holder": self.worker_id}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"holder": self.worker_id, "expires_at": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Someone else holds a live lease
+            lease = None
+        became_leader = lease is not None and not self.is_leader
+        self.is_leader = lease is not None
+        if became_leader:
+            logger.info("Scheduler leadership acquired by %s", self.worker_id)
+        return self.is_leader
+
+    async def release_lease(self) -> None:
+        if self.is_leader:
+            await self.db.scheduler_leases.delete_one({"_id": LEASE_ID, "holder": self.worker_id})
+            self.is_leader = False
+
+    async def _claim(self, job: Job, slot: datetime) -> bool:
+        try:
+            await self.db.scheduled_jobs.find_one_and_update(
+                {"_id": job.name, "$or": [{"last_slot": {"$lt": slot}}, {"last_slot": None}]},
+                {"$set": {"last_slot": slot, "claimed_by": self.worker_id}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # The job document exists and already covers this slot
+            return False
+        return True
+
+    async def run_due(self, now: Optional[datetime] = None) -> int:
+        now = now or datetime.utcnow()
+        ran = 0
+        for job in self.jobs.values():
+            slot = job.slot_for(now)
+            if not await self._claim(job, slot):
+                continue
+            run = {
+                "job": job.name,
+                "slot": slot,
+                "worker": self.worker_id,
+                "started_at": datetime.utcnow(),
+                "caught_up": (now - slot).total_seconds() > 2 * self.tick_seconds + self.lease_seconds,
+            }
+            try:
+                run["result"] = await job.run(slot)
+                run["status"] = "succeeded"
+            except Exception as e:
+                logger.exception("Scheduled job %s failed", job.name)
+                run["status"] = "failed"
+                run["error"] = str(e)
+            run["finished_at"] = datetime.utcnow()
+            await self.db.job_runs.insert_one(run)
+            await self.db.scheduled_jobs.update_one(
+                {"_id": job.name},
+                {"$set": {"last_status": run["status"], "last_finished_at": run["finished_at"]}},
+            )
+            ran += 1
+        return ran
+
+    async def tick(self) -> None:
+        if await self.acquire_lease():
+            await self.run_due()
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Scheduler tick failed: %s", e)
+            await asyncio.sleep(self.tick_seconds)
+
+    def start(self, db) -> None:
+        self.db = db
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.release_lease()
+
+    async def status(self) -> dict:
+        lease = await self.db.scheduler_leases.find_one({"_id": LEASE_ID}, {"_id": 0})
+        jobs = await self.db.scheduled_jobs.find({}).to_list(None)
+        runs = await self.db.job_runs.find({}, {"_id": 0}).sort("started_at", -1).limit(20).to_list(20)
+        return {
+            "worker": self.worker_id,
+            "is_leader": self.is_leader,
+            "lease": lease,
+            "jobs": [{"name": job.pop("_id"), **job} for job in jobs],
+            "recent_runs": runs,
+        }
@@ -0,0 +1,244 @@
+import heapq
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import chain, islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# A term in the name counts this many times more than one in the description,
+# and a little more again in short names, so "Push-ups" beats "Archer Push-ups"
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+# A query term that only matches as a prefix scores this fraction of an exact match
+PREFIX_FACTOR = 0.5
+SEARCHABLE_FIELDS = ("name", "description", "level", "tags")
+# Distinct queries whose matches are kept between catalogue changes
+MATCH_CACHE_SIZE = 4096
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _searchable(exercise: dict) -> dict:
+    return {field: exercise.get(field) for field in SEARCHABLE_FIELDS}
+
+
+class SearchIndex:
+    """Inverted index over exercise names and descriptions, with level and tag facets.
+
+    ``postings`` maps each term to the exercises containing it and their
+    weight; ``terms`` keeps the vocabulary sorted so a prefix is a bisect
+    plus a short scan. ``sync`` applies only the exercises that changed, so a
+    reload after one edit does not rebuild the whole index.
+
+    The match scores of recent queries, and their facet counts once asked
+    for, are kept until the next change. A common word can match thousands
+    of exercises, so instead of sorting every match a query picks its page
+    with a bounded heap; repeats only pay for the level/tag filter and that.
+    """
+
+    def __init__(self):
+        self.docs: Dict[str, dict] = {}
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.terms: List[str] = []
+        self.doc_terms: Dict[str, Set[str]] = {}
+        self.by_level: Dict[str, Set[str]] = {}
+        self.by_tag: Dict[str, Set[str]] = {}
+        self.level_of: Dict[str, str] = {}
+        self.tags_of: Dict[str, List[str]] = {}
+        self._cache: Dict[Tuple[str, ...], Dict[str, float]] = {}
+        self._facets: Dict[Tuple[str, ...], Dict[str, Dict[str, int]]] = {}
+        self._browse: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, exercise: dict) -> None:
+        exercise_id = exercise["id"]
+        if exercise_id in self.docs:
+            self.remove(exercise_id)
+        self._clear_caches()
+        weights: Dict[str, float] = dict.fromkeys(tokenize(exercise.get("description", "")), DESCRIPTION_WEIGHT)
+        name_terms = tokenize(exercise.get("name", ""))
+        for term in name_terms:
+            weights[term] = weights.get(term, 0) + NAME_WEIGHT * (1 + 1 / len(name_terms))
+        for term, weight in weights.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                insort(self.terms, term)
+            postings[exercise_id] = weight
+        self.doc_terms[exercise_id] = set(weights)
+        self.docs[exercise_id] = exercise
+        self.level_of[exercise_id] = exercise["level"]
+        self.tags_of[exercise_id] = list(exercise.get("tags", []))
+        self.by_level.setdefault(exercise["level"], set()).add(exercise_id)
+        for tag in self.tags_of[exercise_id]:
+            self.by_tag.setdefault(tag, set()).add(exercise_id)
+
+    def remove(self, exercise_id: str) -> None:
+        exercise = self.docs.pop(exercise_id, None)
+        if exercise is None:
+            return
+        self._clear_caches()
+        for term in self.doc_terms.pop(exercise_id):
+            postings = self.postings[term]
+            del postings[exercise_id]
+            if not postings:
+                del self.postings[term]
+                del self.terms[bisect_left(self.terms, term)]
+        self._discard(self.by_level, self.level_of.pop(exercise_id), exercise_id)
+        for tag in self.tags_of.pop(exercise_id):
+            self._discard(self.by_tag, tag, exercise_id)
+
+    def _clear_caches(self) -> None:
+        self._cache.clear()
+        self._facets.clear()
+        self._browse = None
+
+    @staticmethod
+    def _discard(facet: Dict[str, Set[str]], value: str, exercise_id: str) -> None:
+        ids = facet.get(value)
+        if ids is not None:
+            ids.discard(exercise_id)
+            if not ids:
+                del facet[value]
+
+    def sync(self, exercises: Iterable[dict]) -> Dict[str, int]:
+        """Bring the index in line with ``exercises``, touching only what changed."""
+        current = {ex["id"]: ex for ex in exercises}
+        removed = [exercise_id for exercise_id in self.docs if exercise_id not in current]
+        for exercise_id in removed:
+            self.remove(exercise_id)
+        changed = 0
+        for exercise_id, exercise in current.items():
+            indexed = self.docs.get(exercise_id)
+            if indexed is None or _searchable(indexed) != _searchable(exercise):
+                self.add(exercise)
+                changed += 1
+            else:
+                # Same searchable content; still serve the newest copy
+                self.docs[exercise_id] = exercise
+        if changed or removed:
+            # Prepare the browse order now rather than in the first request after the change
+            self._browse_order()
+        return {"changed": changed, "removed": len(removed)}
+
+    def _token_scores(self, token: str) -> Dict[str, float]:
+        """Best score per exercise for one query token, exact or as a prefix.
+
+        The result may be a postings dict itself; callers must not modify it.
+        """
+        terms = []
+        for position in range(bisect_left(self.terms, token), len(self.terms)):
+            term = self.terms[position]
+            if not term.startswith(token):
+                break
+            terms.append(term)
+        if len(terms) == 1 and terms[0] == token:
+            return self.postings[token]
+        scores: Dict[str, float] = {}
+        for term in terms:
+            factor = 1.0 if term == token else PREFIX_FACTOR
+            for exercise_id, weight in self.postings[term].items():
+                score = weight * factor
+                if score > scores.get(exercise_id, 0):
+                    scores[exercise_id] = score
+        return scores
+
+    def _browse_order(self) -> List[str]:
+        # Without a query everything matches, in name order
+        if self._browse is None:
+            self._browse = sorted(self.docs, key=lambda exercise_id: (self.docs[exercise_id]["name"], exercise_id))
+        return self._browse
+
+    def _scores(self, tokens: Tuple[str, ...]) -> Dict[str, float]:
+        """Score of every exercise matching all ``tokens``; callers must not modify it."""
+        cached = self._cache.get(tokens)
+        if cached is not None:
+            return cached
+        if len(tokens) == 1:
+            scores = self._token_scores(tokens[0])
+        else:
+            # Every token must match; start from the rarest
+            per_token = sorted((self._scores(tokens[i:i + 1]) for i in range(len(tokens))), key=len)
+            scores = dict(per_token[0])
+            for more in per_token[1:]:
+                scores = {exercise_id: score + more[exercise_id] for exercise_id, score in scores.items() if exercise_id in more}
+        if len(self._cache) >= MATCH_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[tokens] = scores
+        return scores
+
+    def _facet_counts(self, tokens: Tuple[str, ...]) -> Dict[str, Dict[str, int]]:
+        cached = self._facets.get(tokens)
+        if cached is not None:
+            return cached
+        if not tokens:
+            facets = {
+                "level": {value: len(ids) for value, ids in self.by_level.items()},
+                "tag": {value: len(ids) for value, ids in self.by_tag.items()},
+            }
+        else:
+            # Counting stays in C (Counter over map)
+            scores = self._scores(tokens)
+            facets = {
+                "level": dict(Counter(map(self.level_of.__getitem__, scores))),
+                "tag": dict(Counter(chain.from_iterable(map(self.tags_of.__getitem__, scores)))),
+            }
+        if len(self._facets) >= MATCH_CACHE_SIZE:
+            self._facets.clear()
+        self._facets[tokens] = facets
+        return facets
+
+    def _filtered(self, ids: Iterable[str], level: Optional[str], tag: Optional[str]) -> Iterable[str]:
+        if level is not None:
+            ids = filter(self.by_level.get(level, set()).__contains__, ids)
+        if tag is not None:
+            ids = filter(self.by_tag.get(tag, set()).__contains__, ids)
+        return ids
+
+    def search(
+        self,
+        query: str = "",
+        level: Optional[str] = None,
+        tag: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+        facets: bool = False,
+    ) -> dict:
+        """Exercises matching every query token (each as a word or prefix), best first.
+
+        Without a query every exercise matches, in name order; equal scores
+        keep catalogue order. With ``facets`` the level and tag counts of all
+        text matches are added, before ``level`` and ``tag`` narrow them, so
+        clients can show what each filter would leave.
+        """
+        tokens = tuple(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            scores = None
+            ranked = self._filtered(self._browse_order(), level, tag)
+            if level is None and tag is None:
+                total = len(self.docs)
+            elif tag is None:
+                total = len(self.by_level.get(level, ()))
+            elif level is None:
+                total = len(self.by_tag.get(tag, ()))
+            else:
+                total = len(self.by_level.get(level, set()) & self.by_tag.get(tag, set()))
+            page = list(islice(ranked, offset, offset + limit))
+        else:
+            scores = self._scores(tokens)
+            candidates = list(self._filtered(scores, level, tag))
+            total = len(candidates)
+            # Only the page is ordered; nlargest keeps the order of equal scores, as sorted does
+            page = heapq.nlargest(offset + limit, candidates, key=scores.__getitem__)[offset:]
+        result = {
+            "total": total,
+            "results": [{**self.docs[exercise_id], "score": scores[exercise_id] if scores else 0.0} for exercise_id in page],
+        }
+        if facets:
+            result["facets"] = self._facet_counts(tokens)
+        return result
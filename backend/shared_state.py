@@ -0,0 +1,237 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "silvergym:invalidate"
+KEY_PREFIX = "silvergym:"
+
+# KEYS[1] bucket; ARGV rate (tokens/s), burst, now (s). Returns {allowed, tokens left}.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+# KEYS[1] value, KEYS[2] cache generation, KEYS[3] key generation; ARGV the
+# generations read before loading, the value and its TTL (ms). Writes only if
+# no invalidation happened in between.
+SET_IF_CURRENT_LUA = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] or (redis.call('GET', KEYS[3]) or '0') ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[3], 'PX', ARGV[4])
+return 1
+"""
+# Outlives any load that could still be comparing against a key's generation
+GENERATION_TTL_SECONDS = 24 * 3600
+
+
+class LocalRateLimiter:
+    """Token bucket per key, held in this process only."""
+
+    def __init__(self, name: str, rate: float, burst: float, max_keys: int = 100000):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def allow(self, key: str) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / self.rate
+
+
+class RedisRateLimiter:
+    """Token bucket per key shared by every process through one Lua script."""
+
+    def __init__(self, redis, name: str, rate: float, burst: float):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self._script = redis.register_script(TOKEN_BUCKET_LUA)
+
+    async def allow(self, key: str) -> Tuple[bool, float]:
+        try:
+            allowed, tokens = await self._script(
+                keys=[f"{KEY_PREFIX}ratelimit:{self.name}:{key}"],
+                args=[self.rate, self.burst, time.time()],
+            )
+        except Exception as e:
+            # Fail open: an unreachable Redis must not lock everyone out
+            logger.warning("Rate limiter %s unavailable: %s", self.name, e)
+            return True, 0.0
+        tokens = float(tokens)
+        return bool(allowed), 0.0 if allowed else (1 - tokens) / self.rate
+
+
+class SharedState:
+    """Cross-process cache and invalidation bus, backed by Redis when configured.
+
+    Without Redis every operation falls back to this process: cache reads
+    miss, writes are dropped and invalidations are only applied locally.
+    """
+
+    def __init__(self, redis=None):
+        self.redis = redis
+        self.origin = uuid.uuid4().hex
+        self._set_if_current = redis.register_script(SET_IF_CURRENT_LUA) if redis is not None else None
+        self._handlers: Dict[str, Callable[[dict], Any]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.redis is not None
+
+    def rate_limiter(self, name: str, rate: float, burst: float):
+        if self.enabled:
+            return RedisRateLimiter(self.redis, name, rate, burst)
+        return LocalRateLimiter(name, rate, burst)
+
+    async def get_json(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        try:
+            raw = await self.redis.get(KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning("Redis read failed for %s: %s", key, e)
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    @staticmethod
+    def _generation_keys(key: str) -> list:
+        cache = key.partition(":")[0]
+        return [f"{KEY_PREFIX}generation:{cache}", f"{KEY_PREFIX}generation:{key}"]
+
+    async def generation(self, key: str) -> Optional[list]:
+        """Invalidation counters of ``key`` (``"<cache>:<id>"``) and its cache, read before loading it.
+
+        Passing them to ``set_json`` stops a load that an invalidation
+        overtook from re-seeding the stale value. None without Redis.
+        """
+        if not self.enabled:
+            return None
+        try:
+            return [value or "0" for value in await self.redis.mget(self._generation_keys(key))]
+        except Exception as e:
+            logger.warning("Redis read failed for %s: %s", key, e)
+            return None
+
+    async def set_json(self, key: str, value: str, ttl: float, generation: Optional[list] = None) -> None:
+        if not self.enabled:
+            return
+        try:
+            if generation is None:
+                await self.redis.set(KEY_PREFIX + key, value, px=int(ttl * 1000))
+            else:
+                await self._set_if_current(
+                    keys=[KEY_PREFIX + key, *self._generation_keys(key)],
+                    args=[*generation, value, int(ttl * 1000)],
+                )
+        except Exception as e:
+            logger.warning("Redis write failed for %s: %s", key, e)
+
+    def on_invalidate(self, cache: str, handler: Callable[[dict], Any]) -> None:
+        self._handlers[cache] = handler
+
+    def _dispatch(self, message: dict) -> None:
+        handler = self._handlers.get(message.get("cache"))
+        if handler is not None:
+            result = handler(message)
+            if inspect.isawaitable(result):
+                asyncio.ensure_future(result)
+
+    async def invalidate(self, cache: str, key: Optional[str] = None, local: bool = True) -> None:
+        """Drop ``key`` (or the whole cache) in Redis and in every other process.
+
+        The local handler runs too unless ``local`` is False, for callers that
+        have already refreshed their own copy.
+        """
+        message = {"cache": cache, "key": key, "origin": self.origin}
+        if local:
+            self._dispatch(message)
+        if not self.enabled:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                if key is not None:
+                    generation = self._generation_keys(f"{cache}:{key}")[1]
+                    pipe.incr(generation)
+                    pipe.expire(generation, GENERATION_TTL_SECONDS)
+                    pipe.delete(f"{KEY_PREFIX}{cache}:{key}")
+                else:
+                    pipe.incr(self._generation_keys(cache)[0])
+                pipe.publish(INVALIDATION_CHANNEL, json.dumps(message))
+                await pipe.execute()
+            if key is None:
+                async for stale in self.redis.scan_iter(match=f"{KEY_PREFIX}{cache}:*", count=1000):
+                    await self.redis.unlink(stale)
+        except Exception as e:
+            logger.warning("Redis invalidation failed for %s/%s: %s", cache, key, e)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for item in pubsub.listen():
+                        if item["type"] != "message":
+                            continue
+                        message = json.loads(item["data"])
+                        if message.get("origin") != self.origin:
+                            self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Invalidation listener lost Redis, retrying: %s", e)
+                await asyncio.sleep(1)
+
+    def start(self) -> None:
+        if self.enabled and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self.enabled:
+            await self.redis.aclose()
+
+
+def shared_state_from_env() -> SharedState:
+    redis_url = os.environ.get('REDIS_URL')
+    if not redis_url:
+        return SharedState()
+    try:
+        import redis.asyncio as redis_asyncio
+    except ImportError:
+        logger.warning("REDIS_URL is set but the redis package is not installed; using in-process state")
+        return SharedState()
+    return SharedState(redis_asyncio.from_url(redis_url, decode_responses=True))
@@ -0,0 +1,351 @@
+import asyncio
+import uuid
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+from pymongo.errors import DuplicateKeyError
+
+# One progress_history document per (user_id, day): exercise ids, count, stars
+# and completions per level, plus the streak of consecutive active days ending
+# that day. Completions maintain it in place; it outlives the raw progress rows.
+# progress_totals holds one lifetime document per member next to it.
+SUMMARY_PROJECTION = {"_id": 0, "exercise_ids": 1, "completed": 1, "stars": 1}
+BATCH_SIZE = 1000
+# Documents updated by awards remember this many recent award keys, so a
+# retried award is recognised; reconciliation retries well within that
+AWARD_MEMORY = 100
+# Lifetime totals remember the days they last counted as active, for the same reason
+DAY_MEMORY = 7
+
+
+def day_number(day: str) -> int:
+    return date.fromisoformat(day).toordinal()
+
+
+def _add(field: str, amount: int) -> dict:
+    return {"$add": [{"$ifNull": [f"${field}", 0]}, amount]}
+
+
+def summary_update(
+    day: str, exercise_ids: Iterable[str], stars: int, levels: Optional[Dict[str, int]], award: str, streak: int
+) -> list:
+    """Pipeline update adding one award to a day's summary; the day's first award sets its streak."""
+    exercise_ids = list(dict.fromkeys(exercise_ids))
+    held = {"$ifNull": ["$exercise_ids", []]}
+    return [{"$set": {
+        # Ids already in the summary keep their place, as with $addToSet
+        "exercise_ids": {"$concatArrays": [held, *[{"$cond": [{"$in": [ex_id, held]}, [], [ex_id]]} for ex_id in exercise_ids]]},
+        "completed": _add("completed", len(exercise_ids)),
+        "stars": _add("stars", stars),
+        **{f"levels.{level}": _add(f"levels.{level}", count) for level, count in (levels or {}).items()},
+        "day_number": {"$ifNull": ["$day_number", day_number(day)]},
+        "streak": {"$ifNull": ["$streak", streak]},
+        "awards": {"$concatArrays": [{"$ifNull": ["$awards", []]}, [award]]},
+    }}]
+
+
+def totals_update(
+    day: str, completed: int, stars: int, levels: Optional[Dict[str, int]], award: str, streak: int
+) -> list:
+    """Pipeline update adding one award to a member's lifetime totals.
+
+    recent_days tells whether ``day`` was already counted as active, so the
+    totals need not wait for the summary write to find out.
+    """
+    counted = {"$or": [{"$in": [day, {"$ifNull": ["$recent_days", []]}]}, {"$eq": ["$last_day", day]}]}
+    return [{"$set": {
+        "completed": _add("completed", completed),
+        "stars": _add("stars", stars),
+        **{f"levels.{level}": _add(f"levels.{level}", count) for level, count in (levels or {}).items()},
+        "active_days": _add("active_days", {"$cond": [counted, 0, 1]}),
+        "recent_days": {"$cond": [
+            counted,
+            "$recent_days",
+            {"$slice": [{"$concatArrays": [{"$ifNull": ["$recent_days", []]}, [day]]}, -DAY_MEMORY]},
+        ]},
+        "longest_streak": {"$max": [{"$ifNull": ["$longest_streak", 0]}, streak]},
+        "last_day": {"$max": [{"$ifNull": ["$last_day", day]}, day]},
+        "first_day": {"$min": [{"$ifNull": ["$first_day", day]}, day]},
+        "awards": {"$slice": [{"$concatArrays": [{"$ifNull": ["$awards", []]}, [award]]}, -AWARD_MEMORY]},
+    }}]
+
+
+async def streak_before(db, user_id: str, day: str) -> int:
+    """The streak that ended the day before ``day``; 0 if the member was not active then."""
+    yesterday = (date.fromisoformat(day) - timedelta(days=1)).isoformat()
+    previous = await db.progress_history.find_one({"user_id": user_id, "day": yesterday}, {"_id": 0, "streak": 1})
+    return (previous or {}).get("streak", 0)
+
+
+async def _apply(collection, query: dict, update: list) -> None:
+    try:
+        await collection.update_one(query, update, upsert=True)
+    except DuplicateKeyError:
+        # Already holds the award, or a concurrent first write created the document
+        await collection.update_one(query, update)
+
+
+async def record(
+    db,
+    user_id: str,
+    day: str,
+    exercise_ids: Iterable[str],
+    stars: int,
+    levels: Optional[Dict[str, int]] = None,
+    award: Optional[str] = None,
+    previous_streak: Optional[int] = None,
+) -> None:
+    """Add one award's completions to the day's summary and the lifetime totals.
+
+    Both documents list the awards they contain and skip one they already
+    hold, so recording the same ``award`` again changes nothing. The two are
+    written in parallel; callers that already read ``previous_streak``
+    (see streak_before) save the lookup.
+    """
+    award = award or str(uuid.uuid4())
+    exercise_ids = list(dict.fromkeys(exercise_ids))
+    if previous_streak is None:
+        previous_streak = await streak_before(db, user_id, day)
+    streak = previous_streak + 1
+    await asyncio.gather(
+        _apply(
+            db.progress_history,
+            {"user_id": user_id, "day": day, "awards": {"$ne": award}},
+            summary_update(day, exercise_ids, stars, levels, award, streak),
+        ),
+        _apply(
+            db.progress_totals,
+            {"user_id": user_id, "awards": {"$ne": award}},
+            totals_update(day, len(exercise_ids), stars, levels, award, streak),
+        ),
+    )
+
+
+def _level_totals(levels: Sequence[str]) -> dict:
+    return {level: {"$sum": {"$ifNull": [f"$levels.{level}", 0]}} for level in levels}
+
+
+async def history(db, user_id: str, start: str, end: str, levels: Sequence[str]) -> dict:
+    """Per-day stars and completions between ``start`` and ``end`` with their totals.
+
+    Reads at most one summary per day in the range through the (user_id, day)
+    index, however many completions those days hold.
+    """
+    pipeline = [
+        {"$match": {"user_id": user_id, "day": {"$gte": start, "$lte": end}}},
+        {"$sort": {"day": 1}},
+        {"$facet": {
+            "days": [{"$project": {
+                "_id": 0,
+                "day": 1,
+                "stars": 1,
+                "completed": 1,
+                "levels": {"$ifNull": ["$levels", {}]},
+            }}],
+            "totals": [{"$group": {
+                "_id": None,
+                "active_days": {"$sum": 1},
+                "stars": {"$sum": "$stars"},
+                "completed": {"$sum": "$completed"},
+                **_level_totals(levels),
+            }}],
+        }},
+    ]
+    result = (await db.progress_history.aggregate(pipeline).to_list(1))[0]
+    totals = result["totals"][0] if result["totals"] else {}
+    return {
+        "start": start,
+        "end": end,
+        "days": result["days"],
+        "totals": {
+            "active_days": totals.get("active_days", 0),
+            "stars": totals.get("stars", 0),
+            "completed": totals.get("completed", 0),
+            "levels": {level: totals.get(level, 0) for level in levels},
+        },
+    }
+
+
+async def streaks(db, user_id: str, today: str, start: str, end: str) -> dict:
+    """Current streak, the longest one within ``start``..``end`` and lifetime figures.
+
+    A streak still counts as current until a whole day passes without a
+    completion, so one that ended yesterday can be continued today.
+    """
+    yesterday = (date.fromisoformat(today) - timedelta(days=1)).isoformat()
+    latest = await db.progress_history.find_one(
+        {"user_id": user_id, "day": {"$in": [yesterday, today]}},
+        {"_id": 0, "day": 1, "streak": 1},
+        sort=[("day", -1)],
+    )
+    current = latest.get("streak", 1) if latest else 0
+
+    # Streaks that began before the range only count their days inside it
+    pipeline = [
+        {"$match": {"user_id": user_id, "day": {"$gte": start, "$lte": end}}},
+        {"$project": {"_id": 0, "day": 1, "length": {"$min": [
+            {"$ifNull": ["$streak", 1]},
+            {"$add": [{"$subtract": ["$day_number", day_number(start)]}, 1]},
+        ]}}},
+        {"$sort": {"length": -1, "day": 1}},
+        {"$limit": 1},
+    ]
+    longest = await db.progress_history.aggregate(pipeline).to_list(1)
+    totals = await db.progress_totals.find_one({"user_id": user_id}, {"_id": 0, "user_id": 0}) or {}
+    return {
+        "start": start,
+        "end": end,
+        "current": {
+            "days": current,
+            "since": (date.fromisoformat(latest["day"]) - timedelta(days=current - 1)).isoformat() if latest else None,
+            "completed_today": bool(latest) and latest["day"] == today,
+        },
+        "longest": {
+            "days": longest[0]["length"] if longest else 0,
+            "ended": longest[0]["day"] if longest else None,
+        },
+        "all_time": {
+            "longest_streak": totals.get("longest_streak", 0),
+            "active_days": totals.get("active_days", 0),
+            "first_day": totals.get("first_day"),
+            "last_day": totals.get("last_day"),
+        },
+    }
+
+
+def _from_progress_pipeline(day: str) -> list:
+    return [
+        {"$match": {"day": day}},
+        {"$group": {
+            "_id": "$user_id",
+            "stars": {"$sum": "$stars_earned"},
+            "exercise_ids": {"$addToSet": "$exercise_id"},
+            "awards": {"$addToSet": "$award"},
+            "pending": {"$max": {"$eq": ["$award_pending", True]}},
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id",
+            "day": day,
+            "stars": 1,
+            "exercise_ids": 1,
+            "awards": 1,
+            "pending": 1,
+            "completed": {"$size": "$exercise_ids"},
+        }},
+    ]
+
+
+def _expected_levels(exercise_ids: Iterable[str], level_of: Callable[[str], Optional[str]]) -> Dict[str, int]:
+    # Exercises no longer in the catalogue are left out, as they are when awarded
+    levels: Dict[str, int] = {}
+    for exercise_id in exercise_ids:
+        level = level_of(exercise_id)
+        if level is not None:
+            levels[level] = levels.get(level, 0) + 1
+    return levels
+
+
+def _matches(summary: dict, expected: dict) -> bool:
+    return (
+        summary.get("stars") == expected["stars"]
+        and summary.get("completed") == expected["completed"]
+        and sorted(summary.get("exercise_ids", [])) == sorted(expected["exercise_ids"])
+        and {level: count for level, count in summary.get("levels", {}).items() if count} == expected["levels"]
+        and summary.get("streak") == expected["streak"]
+    )
+
+
+async def _repair(db, day: str, current: Optional[dict], expected: dict) -> None:
+    """Rewrite one summary from progress and carry the difference into the member's totals."""
+    user_id = expected["user_id"]
+    await db.progress_history.update_one(
+        {"user_id": user_id, "day": day},
+        {"$set": {
+            "day_number": day_number(day),
+            **{field: expected[field] for field in ("stars", "completed", "exercise_ids", "levels", "streak")},
+            # Awards recorded in the summary, so a late retry of one of them is still recognised
+            "awards": [award for award in expected["awards"] if award is not None],
+        }},
+        upsert=True,
+    )
+    current = current or {}
+    increments = {
+        "stars": expected["stars"] - current.get("stars", 0),
+        "completed": expected["completed"] - current.get("completed", 0),
+        "active_days": 0 if current else 1,
+    }
+    for level in set(expected["levels"]) | set(current.get("levels", {})):
+        increments[f"levels.{level}"] = expected["levels"].get(level, 0) - current.get("levels", {}).get(level, 0)
+
+    # Later days of the same streak counted from the old value; follow them until one already agrees
+    longest, streak, following = expected["streak"], expected["streak"], date.fromisoformat(day)
+    while True:
+        following += timedelta(days=1)
+        result = await db.progress_history.find_one_and_update(
+            {"user_id": user_id, "day": following.isoformat(), "streak": {"$ne": streak + 1}},
+            {"$set": {"streak": streak + 1}},
+            projection={"_id": 1},
+        )
+        if result is None:
+            break
+        streak += 1
+        longest = max(longest, streak)
+    totals = {"$max": {"longest_streak": longest, "last_day": day}, "$min": {"first_day": day}}
+    changed = {field: delta for field, delta in increments.items() if delta}
+    if changed:
+        totals["$inc"] = changed
+    if not current:
+        totals["$push"] = {"recent_days": {"$each": [day], "$slice": -DAY_MEMORY}}
+    await db.progress_totals.update_one({"user_id": user_id}, totals, upsert=True)
+
+
+async def check(db, day: str, repair: bool = False, level_of: Callable[[str], Optional[str]] = lambda _: None) -> dict:
+    """Compare one day's summaries with the raw progress rows.
+
+    Reports members whose summary is missing or differs (stars, exercises,
+    level counts or streak), and summaries with no progress behind them
+    (expected once rows pass the retention window). Members with an award
+    the reconciliation sweep has not confirmed yet are listed as pending and
+    left alone, since the award updates their summary itself. With ``repair`` each
+    missing or differing summary is rebuilt whole from progress, the streaks
+    of the days after it are renumbered and the member's lifetime totals are
+    corrected by the difference.
+    """
+    expected = {}
+    pending = []
+    async for row in db.progress.aggregate(_from_progress_pipeline(day), batchSize=BATCH_SIZE):
+        if row["pending"]:
+            pending.append(row["user_id"])
+            continue
+        row["levels"] = _expected_levels(row["exercise_ids"], level_of)
+        row["streak"] = 1
+        expected[row["user_id"]] = row
+    yesterday = (date.fromisoformat(day) - timedelta(days=1)).isoformat()
+    async for previous in db.progress_history.find({"day": yesterday}, {"_id": 0, "user_id": 1, "streak": 1}):
+        if previous["user_id"] in expected:
+            expected[previous["user_id"]]["streak"] = previous.get("streak", 1) + 1
+
+    mismatched, orphaned = [], []
+    async for summary in db.progress_history.find({"day": day, "user_id": {"$nin": pending}}, {"_id": 0}):
+        want = expected.pop(summary["user_id"], None)
+        if want is None:
+            orphaned.append(summary["user_id"])
+        elif not _matches(summary, want):
+            mismatched.append((summary, want))
+    missing = [(None, want) for want in expected.values()]
+
+    repaired = 0
+    if repair:
+        for current, want in mismatched + missing:
+            await _repair(db, day, current, want)
+            repaired += 1
+
+    return {
+        "day": day,
+        "mismatched": [want["user_id"] for _, want in mismatched],
+        "missing": [want["user_id"] for _, want in missing],
+        "orphaned": orphaned,
+        "pending": pending,
+        "repaired": repaired,
+    }
@@ -0,0 +1,67 @@
+from datetime import datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional
+from zoneinfo import ZoneInfo, available_timezones
+
+DEFAULT_ZONE = "UTC"
+
+
+class DayWindow(NamedTuple):
+    day: str
+    # Naive UTC bounds, like every other datetime we store
+    start: datetime
+    end: datetime
+
+
+@lru_cache(maxsize=None)
+def zone_info(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
+@lru_cache(maxsize=1)
+def _known_zones() -> frozenset:
+    return frozenset(available_timezones())
+
+
+def is_valid_zone(name: str) -> bool:
+    # Only the published list: ZoneInfo() itself raises OSError for directory
+    # names such as "America" and for overlong keys
+    return name in _known_zones()
+
+
+def compute_window(zone: str, now: datetime) -> DayWindow:
+    tz = zone_info(zone)
+    local_date = now.replace(tzinfo=timezone.utc).astimezone(tz).date()
+    start = datetime.combine(local_date, time(0), tzinfo=tz)
+    end = datetime.combine(local_date + timedelta(days=1), time(0), tzinfo=tz)
+    return DayWindow(
+        local_date.strftime("%Y-%m-%d"),
+        start.astimezone(timezone.utc).replace(tzinfo=None),
+        end.astimezone(timezone.utc).replace(tzinfo=None),
+    )
+
+
+class DayWindows:
+    """Current local day of each time zone, recomputed only when it ends.
+
+    Lookups are a dict access and two comparisons; the zone rules are only
+    consulted at a zone's midnight (or when asked about another moment).
+    """
+
+    def __init__(self):
+        self._windows: Dict[str, DayWindow] = {}
+
+    def window(self, zone: Optional[str] = None, now: Optional[datetime] = None) -> DayWindow:
+        zone = zone or DEFAULT_ZONE
+        now = now or datetime.utcnow()
+        cached = self._windows.get(zone)
+        if cached is not None and cached.start <= now < cached.end:
+            return cached
+        window = compute_window(zone, now)
+        if cached is None or window.start >= cached.start:
+            # Keep the newest window; a lookup for a past moment does not evict it
+            self._windows[zone] = window
+        return window
+
+    def day_key(self, zone: Optional[str] = None, now: Optional[datetime] = None) -> str:
+        return self.window(zone, now).day
@@ -0,0 +1,40 @@
+"""Logging a workout of N exercises: N single completions vs one batch call.
+
+Usage: python benchmarks/bench_batch_completion.py [--sizes 5 10] [--rounds 20]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from harness import app_client, create_members, server, summarize
+
+
+async def run(sizes, rounds):
+    results = {}
+    async with app_client() as http:
+        exercise_ids = list(server.catalogue.snapshot.by_id)
+        for size in sizes:
+            members = await create_members(http, 2 * rounds, prefix=f"batch{size}")
+            single, batch = [], []
+            for i in range(rounds):
+                _, headers = members[2 * i]
+                start = time.perf_counter()
+                for ex_id in exercise_ids[:size]:
+                    await http.post(f"/api/exercises/{ex_id}/complete", headers=headers)
+                single.append(time.perf_counter() - start)
+
+                _, headers = members[2 * i + 1]
+                start = time.perf_counter()
+                await http.post("/api/exercises/complete-batch", json={"exercise_ids": exercise_ids[:size]}, headers=headers)
+                batch.append(time.perf_counter() - start)
+            results[f"{size}_exercises"] = {"single_calls": summarize(single), "batch_call": summarize(batch)}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.sizes, args.rounds)), indent=2))
@@ -0,0 +1,95 @@
+"""Cost of the nightly job: legacy full wipe vs the partitioned rollover.
+
+Seeds N members, a share of whom completed exercises yesterday, then times
+the old delete_many/update_many wipe and run_daily_rollover on the same data.
+
+Usage: python benchmarks/bench_daily_reset.py [--members 10000 100000] [--active 0.2]
+Set BENCH_MONGO_URL to a local mongod for representative numbers; mongomock
+has no real indexes or storage engine and is very slow at 100k documents.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from harness import server
+
+EXERCISES_PER_ACTIVE_MEMBER = 5
+
+
+async def seed(db, members: int, active_share: float, now: datetime):
+    yesterday = now - timedelta(days=1)
+    day = server.day_key(yesterday)
+    active = int(members * active_share)
+    users, progress = [], []
+    for i in range(members):
+        user_id = str(uuid.uuid4())
+        is_active = i < active
+        users.append({
+            "id": user_id,
+            "username": f"member_{i}",
+            "email": f"member_{i}@example.com",
+            "password_hash": "x",
+            "status": "approved",
+            "payment_status": "paid",
+            "created_at": now,
+            "total_stars": EXERCISES_PER_ACTIVE_MEMBER if is_active else 0,
+            "stars_day": day if is_active else None,
+            "timezone": "UTC",
+        })
+        if is_active:
+            progress.extend(
+                {"id": str(uuid.uuid4()), "user_id": user_id, "exercise_id": f"ex-{n}",
+                 "completed_date": yesterday, "day": day, "stars_earned": 1}
+                for n in range(EXERCISES_PER_ACTIVE_MEMBER)
+            )
+    await db.users.insert_many(users)
+    if progress:
+        await db.progress.insert_many(progress)
+
+
+async def fresh_db(mongo_url, name):
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongo_url)
+        await client.drop_database(name)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+    server.db = client[name]
+    await server.init_database()
+    return client
+
+
+async def run(sizes, active_share, mongo_url=None):
+    now = datetime.utcnow()
+    results = {}
+    for members in sizes:
+        await fresh_db(mongo_url, f"silvergym_bench_reset_{members}")
+        await seed(server.db, members, active_share, now)
+        start = time.perf_counter()
+        deleted = await server.db.progress.delete_many({})
+        updated = await server.db.users.update_many({}, {"$set": {"total_stars": 0}})
+        legacy = {"seconds": time.perf_counter() - start, "progress_deleted": deleted.deleted_count,
+                  "users_written": updated.modified_count}
+
+        client = await fresh_db(mongo_url, f"silvergym_bench_reset_{members}")
+        await seed(server.db, members, active_share, now)
+        start = time.perf_counter()
+        rollover = await server.run_daily_rollover(now)
+        rollover["seconds"] = time.perf_counter() - start
+        if mongo_url:
+            await client.drop_database(server.db.name)
+        results[f"{members}_members"] = {"legacy_wipe": legacy, "rollover": rollover}
+    return results
+
+
+if __name__ == "__main__":
+    import os
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--active", type=float, default=0.2, help="share of members active yesterday")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.members, args.active, os.environ.get("BENCH_MONGO_URL"))), indent=2))
@@ -0,0 +1,142 @@
+"""Leaderboard reads at 100k members: sorting users vs the maintained rankings.
+
+For each backend the benchmark times a top-N read plus the caller's own rank
+for randomly chosen members, and the cost of recording one completion.
+
+    naive_users_sort  sort users by total_stars, count the members ahead
+    mongo_entries     leaderboard_entries walked through its rank index
+    redis_sorted_set  ZREVRANGE/ZREVRANK on the mirrored sorted set
+
+Usage: python benchmarks/bench_leaderboard.py [--members 100000] [--rounds 200] [--limit 10]
+
+Set BENCH_MONGO_URL to use a local mongod (mongomock-motor has no indexes, so
+its Mongo numbers are full scans) and BENCH_REDIS_URL to use a real Redis
+instead of fakeredis.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from harness import server, summarize
+
+from leaderboard import ALL_LEVELS, Leaderboard, board_key
+
+DAY = "2026-01-07"
+SEED_BATCH = 5000
+
+
+async def fresh_db(mongo_url):
+    name = "silvergym_bench_leaderboard"
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongo_url)
+        await client.drop_database(name)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+    server.db = client[name]
+    await server.init_database()
+    return client
+
+
+def redis_client(redis_url):
+    if redis_url:
+        import redis.asyncio as redis_asyncio
+        return redis_asyncio.from_url(redis_url, decode_responses=True)
+    try:
+        import fakeredis
+    except ImportError:
+        return None
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+async def seed(db, members, rng):
+    user_ids = []
+    users, entries = [], []
+    for i in range(members):
+        user_id = str(uuid.uuid4())
+        stars = rng.randint(0, 500)
+        user_ids.append(user_id)
+        users.append({"id": user_id, "username": f"member_{i}", "email": f"member_{i}@example.com",
+                      "password_hash": "x", "status": "approved", "total_stars": stars, "stars_day": DAY})
+        entries.append({"board": board_key("all_time", DAY), "level": ALL_LEVELS, "user_id": user_id, "stars": stars})
+        if len(users) == SEED_BATCH:
+            await db.users.insert_many(users)
+            await db.leaderboard_entries.insert_many(entries)
+            users, entries = [], []
+    if users:
+        await db.users.insert_many(users)
+        await db.leaderboard_entries.insert_many(entries)
+    return user_ids
+
+
+async def naive_ranking(db, user_id, limit):
+    top = await db.users.find({}, {"_id": 0, "id": 1, "username": 1, "total_stars": 1}).sort("total_stars", -1).limit(limit).to_list(limit)
+    me = await db.users.find_one({"id": user_id}, {"total_stars": 1})
+    ahead = await db.users.count_documents({"total_stars": {"$gt": me["total_stars"]}})
+    return top, ahead + 1
+
+
+async def timed(samples, coro):
+    start = time.perf_counter()
+    await coro
+    samples.append(time.perf_counter() - start)
+
+
+async def run(members, rounds, limit, mongo_url, redis_url):
+    rng = random.Random(1)
+    client = await fresh_db(mongo_url)
+    db = server.db
+    user_ids = await seed(db, members, rng)
+    callers = [rng.choice(user_ids) for _ in range(rounds)]
+    results = {"members": members, "rounds": rounds, "limit": limit}
+
+    naive = []
+    for user_id in callers:
+        await timed(naive, naive_ranking(db, user_id, limit))
+    results["naive_users_sort"] = summarize(naive)
+
+    mongo_board = Leaderboard()
+    reads, writes = [], []
+    for user_id in callers:
+        await timed(reads, mongo_board.ranking(db, "all_time", None, DAY, user_id, limit))
+        await timed(writes, mongo_board.record(db, user_id, DAY, 1, {"beginner": 1}))
+    results["mongo_entries"] = {"ranking": summarize(reads), "record": summarize(writes)}
+
+    redis = redis_client(redis_url)
+    if redis is not None:
+        redis_board = Leaderboard(redis)
+        async for key in redis.scan_iter(match="silvergym:leaderboard:*"):
+            await redis.unlink(key)
+        start = time.perf_counter()
+        loaded = await redis_board.rebuild_redis(db, force=True)
+        rebuild_s = time.perf_counter() - start
+        reads, writes = [], []
+        for user_id in callers:
+            await timed(reads, redis_board.ranking(db, "all_time", None, DAY, user_id, limit))
+            await timed(writes, redis_board.record(db, user_id, DAY, 1, {"beginner": 1}))
+        results["redis_sorted_set"] = {
+            "rebuild": {"entries": loaded, "seconds": rebuild_s},
+            "ranking": summarize(reads),
+            "record": summarize(writes),
+        }
+        await redis.aclose()
+
+    if mongo_url:
+        await client.drop_database(db.name)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    result = asyncio.run(run(args.members, args.rounds, args.limit,
+                             os.environ.get("BENCH_MONGO_URL"), os.environ.get("BENCH_REDIS_URL")))
+    print(json.dumps(result, indent=2))
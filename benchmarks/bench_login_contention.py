@@ -0,0 +1,58 @@
+"""p99 latency of GET /api/exercises/{level} while logins are being hammered.
+
+Usage: python benchmarks/bench_login_contention.py [--logins 200] [--reads 500]
+Compare PASSWORD_WORKERS / PASSWORD_MAX_QUEUE settings via the environment.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from harness import app_client, create_members, server, summarize
+
+
+async def run(logins: int, reads: int, login_concurrency: int):
+    async with app_client() as http:
+        (creds, headers), = await create_members(http, 1)
+        body = {"username": creds["username"], "password": creds["password"]}
+        login_status = {}
+        read_latencies = []
+        done = asyncio.Event()
+
+        async def hammer_logins():
+            sem = asyncio.Semaphore(login_concurrency)
+
+            async def one():
+                async with sem:
+                    r = await http.post("/api/auth/login", json=body)
+                    login_status[r.status_code] = login_status.get(r.status_code, 0) + 1
+
+            await asyncio.gather(*[one() for _ in range(logins)])
+            done.set()
+
+        async def read_exercises():
+            for _ in range(reads):
+                start = time.perf_counter()
+                await http.get("/api/exercises/beginner", headers=headers)
+                read_latencies.append(time.perf_counter() - start)
+                if done.is_set():
+                    break
+                await asyncio.sleep(0)
+
+        started = time.perf_counter()
+        await asyncio.gather(hammer_logins(), read_exercises())
+        return {
+            "elapsed_s": time.perf_counter() - started,
+            "login_status_counts": login_status,
+            "exercise_reads": summarize(read_latencies),
+            "password_pool": server.password_hasher.stats(),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--login-concurrency", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.logins, args.reads, args.login_concurrency)), indent=2))
@@ -0,0 +1,146 @@
+"""Exercise search on a large catalogue: in-memory index vs a scan.
+
+Builds a synthetic catalogue from muscle groups, equipment and movement
+words, then times a mix of member queries (whole words, prefixes, several
+terms, facets only) against:
+
+    search_index         SearchIndex.search with its match cache emptied before every query
+    search_index_repeat  SearchIndex.search with every query's matches already cached
+    linear_scan          tokenize every exercise per query (search without an index)
+
+It also reports the full index build and the cost of syncing a single
+edited exercise, which is what a catalogue reload pays. search_index is
+the number to compare: the cache only helps queries repeated since the
+last catalogue change, and the repeat figure is a best case. The generated
+descriptions draw on a small vocabulary, so common words match a quarter
+of the catalogue.
+
+Usage: python benchmarks/bench_search.py [--exercises 10000] [--queries 2000]
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+
+from harness import summarize
+
+from search import SearchIndex, tokenize
+
+LEVELS = ["beginner", "intermediate", "advanced"]
+MUSCLES = ["chest", "back", "legs", "shoulders", "arms", "core", "glutes", "calves", "full-body"]
+EQUIPMENT = ["bodyweight", "dumbbells", "barbell", "kettlebell", "bands", "cable", "bench", "box", "pull-up-bar"]
+MOVES = [
+    "press", "row", "squat", "lunge", "curl", "raise", "fly", "deadlift", "bridge", "plank", "twist",
+    "thrust", "pull", "push", "jump", "hold", "extension", "crunch", "swing", "carry", "climber", "dip",
+]
+MODIFIERS = [
+    "single-arm", "single-leg", "incline", "decline", "paused", "tempo", "explosive", "seated", "standing",
+    "reverse", "wide", "narrow", "alternating", "isometric", "weighted", "banded", "lateral", "sumo",
+]
+WORDS = MUSCLES + EQUIPMENT + MOVES + MODIFIERS + [
+    "control", "slowly", "brace", "hips", "knees", "shoulder", "width", "return", "start", "position",
+    "lower", "lift", "squeeze", "top", "repeat", "keep", "straight", "breathe", "ground", "floor",
+]
+
+
+def catalogue(size, rng):
+    exercises = []
+    for i in range(size):
+        muscle, equipment = rng.choice(MUSCLES), rng.choice(EQUIPMENT)
+        name = f"{rng.choice(MODIFIERS).title()} {equipment.title()} {rng.choice(MOVES).title()} {i}"
+        description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 30))) + "."
+        exercises.append({
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "description": f"{muscle.title()} exercise. {description}",
+            "level": rng.choice(LEVELS),
+            "tags": [muscle, equipment],
+        })
+    return exercises
+
+
+def queries(count, rng):
+    mix = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            mix.append((rng.choice(MOVES), None, None))
+        elif kind < 0.7:
+            word = rng.choice(MOVES + MODIFIERS)
+            mix.append((word[:rng.randint(2, max(2, len(word) - 1))], None, None))
+        elif kind < 0.9:
+            mix.append((f"{rng.choice(MODIFIERS)} {rng.choice(MOVES)}", rng.choice(LEVELS), None))
+        else:
+            mix.append(("", rng.choice(LEVELS), rng.choice(MUSCLES)))
+    return mix
+
+
+def linear_scan(exercises, query, level, tag, limit=20):
+    tokens = tokenize(query)
+    hits = []
+    for exercise in exercises:
+        if level is not None and exercise["level"] != level:
+            continue
+        if tag is not None and tag not in exercise["tags"]:
+            continue
+        terms = tokenize(exercise["name"]) + tokenize(exercise["description"])
+        if all(any(term.startswith(token) for term in terms) for token in tokens):
+            hits.append(exercise)
+    return hits[:limit]
+
+
+def timed(samples, fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    samples.append(time.perf_counter() - start)
+
+
+def run(size, count):
+    rng = random.Random(1)
+    exercises = catalogue(size, rng)
+    mix = queries(count, rng)
+    results = {"exercises": size, "queries": count}
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.sync(exercises)
+    results["build_ms"] = (time.perf_counter() - start) * 1000
+    results["terms"] = len(index.terms)
+
+    edited = [dict(ex) for ex in exercises]
+    edited[rng.randrange(size)]["description"] += " Added cue."
+    start = time.perf_counter()
+    applied = index.sync(edited)
+    results["sync_one_edit_ms"] = (time.perf_counter() - start) * 1000
+    results["sync_one_edit"] = applied
+
+    samples = []
+    for query, level, tag in mix:
+        # As right after a catalogue change: only the browse order is prepared
+        index._clear_caches()
+        index._browse_order()
+        timed(samples, index.search, query, level, tag)
+    results["search_index"] = summarize(samples)
+
+    for query, level, tag in mix:
+        index.search(query, level, tag)
+    samples = []
+    for query, level, tag in mix:
+        timed(samples, index.search, query, level, tag)
+    results["search_index_repeat"] = summarize(samples)
+
+    # The scan is slow; a slice of the mix is enough to show the gap
+    samples = []
+    for query, level, tag in mix[:max(1, count // 20)]:
+        timed(samples, linear_scan, edited, query, level, tag)
+    results["linear_scan"] = summarize(samples)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--exercises", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.exercises, args.queries), indent=2))
@@ -0,0 +1,97 @@
+"""CPU spent encoding one 5k-user admin listing, per response path.
+
+Each path turns the same list of user documents (as the admin listing reads
+them, without _id or password_hash) into response bytes:
+
+    jsonable_encoder_json   FastAPI's default: jsonable_encoder, then stdlib json
+    response_model          validating through List[AdminUserOut], then encoding
+    stdlib_json_default     json.dumps with a datetime hook (the previous listing)
+    orjson                  orjson.dumps, as the listing does now
+
+Times are process CPU seconds, so nothing else on the machine skews them.
+
+Usage: python benchmarks/bench_serialization.py [--users 5000] [--rounds 50]
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from harness import server
+
+
+def listing(users):
+    now = datetime.utcnow().replace(microsecond=123000)
+    docs = []
+    for i in range(users):
+        docs.append({
+            "id": str(uuid.uuid4()),
+            "username": f"member_{i}",
+            "email": f"member_{i}@example.com",
+            "status": "approved" if i % 5 else "pending",
+            "payment_status": "paid" if i % 3 else "unpaid",
+            "created_at": now - timedelta(minutes=i),
+            "total_stars": i % 12,
+            "stars_day": server.day_key() if i % 2 else None,
+            "token_version": i % 3,
+            "timezone": "UTC",
+        })
+    return docs
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def cpu_summary(samples):
+    ordered = sorted(samples)
+    return {
+        "mean_cpu_ms": sum(samples) / len(samples) * 1000,
+        "p50_cpu_ms": ordered[len(ordered) // 2] * 1000,
+        "max_cpu_ms": ordered[-1] * 1000,
+    }
+
+
+def cpu_samples(encode, docs, rounds):
+    samples = []
+    size = 0
+    for _ in range(rounds):
+        start = time.process_time()
+        size = len(encode(docs))
+        samples.append(time.process_time() - start)
+    return samples, size
+
+
+def run(users, rounds):
+    docs = listing(users)
+    adapter = TypeAdapter(List[server.AdminUserOut])
+    paths = {
+        "jsonable_encoder_json": lambda d: json.dumps(jsonable_encoder(d)).encode(),
+        "response_model": lambda d: adapter.dump_json(adapter.validate_python(d)),
+        "stdlib_json_default": lambda d: json.dumps(d, default=json_default).encode(),
+        "orjson": orjson.dumps,
+    }
+    results = {"users": users, "rounds": rounds}
+    for name, encode in paths.items():
+        samples, size = cpu_samples(encode, docs, rounds)
+        results[name] = {"bytes": size, **cpu_summary(samples)}
+    baseline = results["jsonable_encoder_json"]["mean_cpu_ms"]
+    for name in paths:
+        results[name]["speedup"] = baseline / results[name]["mean_cpu_ms"]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(run(args.users, args.rounds), indent=2))
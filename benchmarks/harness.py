@@ -0,0 +1,89 @@
+import logging
+import os
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py reads these at import time; the in-memory stand-in replaces the client below.
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "silvergym_bench")
+# Every simulated client shares one address; keep the auth rate limits out of the way
+for _limit in ("LOGIN_RATE_PER_MINUTE", "LOGIN_BURST", "SIGNUP_RATE_PER_MINUTE", "SIGNUP_BURST"):
+    os.environ.setdefault(_limit, "1000000")
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+ADMIN = {"username": server.ADMIN_USERNAME, "password": server.ADMIN_PASSWORD}
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+    }
+
+
+@asynccontextmanager
+async def app_client(mongo_url=None):
+    """Yield an httpx client wired to the FastAPI app in-process.
+
+    Uses the Mongo at ``mongo_url`` (or BENCH_MONGO_URL) when given, otherwise
+    an in-memory mongomock-motor database.
+    """
+    mongo_url = mongo_url or os.environ.get("BENCH_MONGO_URL")
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongo_url)
+        db_name = f"silvergym_bench_{int(time.time())}"
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+        db_name = "silvergym_bench"
+    server.db = client[db_name]
+    await server.init_database()
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http:
+            yield http
+    finally:
+        if mongo_url:
+            await client.drop_database(db_name)
+
+
+async def admin_headers(http):
+    response = await http.post("/api/auth/admin/login", json=ADMIN)
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def create_members(http, count, prefix="bench"):
+    """Sign up and approve ``count`` members; return (credentials, auth headers) pairs."""
+    admin = await admin_headers(http)
+    members = []
+    for i in range(count):
+        creds = {"username": f"{prefix}_{i}", "email": f"{prefix}_{i}@example.com", "password": "BenchPass123!"}
+        await http.post("/api/auth/signup", json=creds)
+        user = await server.db.users.find_one({"username": creds["username"]})
+        await http.put(f"/api/admin/users/{user['id']}", json={"status": "approved"}, headers=admin)
+        login = await http.post("/api/auth/login", json={"username": creds["username"], "password": creds["password"]})
+        members.append((creds, {"Authorization": f"Bearer {login.json()['access_token']}"}))
+    return members
@@ -0,0 +1,181 @@
+"""In-process load test replaying the backend_test.py scenarios as a weighted mix.
+
+Virtual users pick a scenario per iteration (signup, login, exercise listing,
+completion, dashboard, admin polling) and every request is timed under its
+route. Results are written as JSON so runs can be compared across commits.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 50 --duration 30 --output results.json
+    python benchmarks/load_test.py --compare baseline.json --output results.json
+
+Set BENCH_MONGO_URL to run against a local mongod instead of mongomock-motor.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import subprocess
+import time
+from collections import defaultdict
+
+from harness import admin_headers, app_client, create_members, server, summarize
+
+DEFAULT_MIX = {
+    "signup": 1,
+    "login": 5,
+    "exercises": 30,
+    "complete": 20,
+    "dashboard": 30,
+    "admin_stats": 5,
+    "admin_users": 3,
+}
+LEVELS = ["beginner", "intermediate", "advanced"]
+
+
+class LoadTest:
+    def __init__(self, http, members, admin, mix):
+        self.http = http
+        self.members = members
+        self.admin = admin
+        self.scenarios = list(mix)
+        self.weights = [mix[name] for name in self.scenarios]
+        self.exercise_ids = list(server.catalogue.snapshot.by_id)
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.signups = itertools.count()
+
+    async def request(self, route, method, url, **kwargs):
+        start = time.perf_counter()
+        response = await self.http.request(method, url, **kwargs)
+        self.samples[route].append(time.perf_counter() - start)
+        self.statuses[route][response.status_code] += 1
+        return response
+
+    async def signup(self, rng):
+        n = next(self.signups)
+        await self.request("POST /api/auth/signup", "POST", "/api/auth/signup", json={
+            "username": f"load_{n}_{rng.random():.6f}",
+            "email": f"load_{n}_{int(rng.random() * 1e9)}@example.com",
+            "password": "LoadPass123!",
+        })
+
+    async def login(self, rng):
+        creds, _ = rng.choice(self.members)
+        await self.request("POST /api/auth/login", "POST", "/api/auth/login",
+                           json={"username": creds["username"], "password": creds["password"]})
+
+    async def exercises(self, rng):
+        _, headers = rng.choice(self.members)
+        await self.request("GET /api/exercises/{level}", "GET", f"/api/exercises/{rng.choice(LEVELS)}", headers=headers)
+
+    async def complete(self, rng):
+        _, headers = rng.choice(self.members)
+        exercise_id = rng.choice(self.exercise_ids)
+        await self.request("POST /api/exercises/{exercise_id}/complete", "POST",
+                           f"/api/exercises/{exercise_id}/complete", headers=headers)
+
+    async def dashboard(self, rng):
+        _, headers = rng.choice(self.members)
+        await self.request("GET /api/user/dashboard", "GET", "/api/user/dashboard", headers=headers)
+
+    async def admin_stats(self, rng):
+        await self.request("GET /api/admin/stats", "GET", "/api/admin/stats", headers=self.admin)
+
+    async def admin_users(self, rng):
+        await self.request("GET /api/admin/users", "GET", "/api/admin/users", headers=self.admin)
+
+    async def virtual_user(self, seed, deadline, remaining):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline and (remaining is None or next(remaining) > 0):
+            scenario = rng.choices(self.scenarios, self.weights)[0]
+            await getattr(self, scenario)(rng)
+
+    def report(self, elapsed):
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            routes[route] = {
+                **summarize(samples),
+                "rps": len(samples) / elapsed,
+                "status_counts": {str(code): n for code, n in sorted(self.statuses[route].items())},
+            }
+        total = sum(len(s) for s in self.samples.values())
+        return {"elapsed_s": elapsed, "total_requests": total, "rps": total / elapsed, "routes": routes}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    if text:
+        for part in text.split(","):
+            name, weight = part.split("=")
+            if name not in DEFAULT_MIX:
+                raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+            mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def compare(baseline, current):
+    """Per-route change in p50/p99 and RPS against a previous run."""
+    rows = {}
+    for route, stats in current["routes"].items():
+        before = baseline["routes"].get(route)
+        if not before:
+            continue
+        rows[route] = {
+            key: {"before": before[key], "after": stats[key], "change_pct": (stats[key] - before[key]) / before[key] * 100 if before[key] else None}
+            for key in ("p50_ms", "p99_ms", "rps")
+        }
+    return rows
+
+
+async def run(args):
+    mix = parse_mix(args.mix)
+    async with app_client() as http:
+        members = await create_members(http, args.members, prefix="load")
+        test = LoadTest(http, members, await admin_headers(http), mix)
+        remaining = itertools.count(args.requests, -1) if args.requests else None
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*[test.virtual_user(args.seed + i, deadline, remaining) for i in range(args.concurrency)])
+        result = test.report(time.perf_counter() - started)
+
+    result["config"] = {
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "requests": args.requests,
+        "members": args.members,
+        "mix": mix,
+        "seed": args.seed,
+        "revision": git_revision(),
+    }
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=None, help="stop after this many scenario iterations")
+    parser.add_argument("--members", type=int, default=20, help="approved members created before the run")
+    parser.add_argument("--mix", default=None, help="scenario weights, e.g. login=10,exercises=50")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    parser.add_argument("--compare", default=None, help="previous JSON report to diff against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare) as f:
+            result["comparison"] = compare(json.load(f), result)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
@@ -4,9 +4,34 @@ set -e
 # Start the FastAPI backend
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
-echo "Starting FastAPI backend"
+# More than one worker needs Redis: without it the user and stats caches,
+# their invalidation, the auth rate limits and the live admin feed are all
+# per process. So one worker per CPU with REDIS_URL, otherwise a single one.
+# Scheduled jobs run in a single leader either way.
+REDIS_URL="${REDIS_URL:-$(sed -n 's/^REDIS_URL=//p' .env 2>/dev/null | tr -d '"')}"
+if [ -n "$REDIS_URL" ]; then
+    WEB_CONCURRENCY="${WEB_CONCURRENCY:-$(nproc 2>/dev/null || echo 1)}"
+else
+    if [ "${WEB_CONCURRENCY:-1}" -gt 1 ]; then
+        echo "WEB_CONCURRENCY=$WEB_CONCURRENCY ignored: multiple workers require REDIS_URL"
+    fi
+    WEB_CONCURRENCY=1
+fi
+export WEB_CONCURRENCY
+
+# Workers share Prometheus metrics through files; stale ones from a previous run are cleared
+PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus-multiproc}"
+if [ "$WEB_CONCURRENCY" -gt 1 ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+    export PROMETHEUS_MULTIPROC_DIR
+else
+    unset PROMETHEUS_MULTIPROC_DIR
+fi
+
+echo "Starting FastAPI backend with $WEB_CONCURRENCY worker(s)"
 # Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
+uvicorn server:app --host 0.0.0.0 --port 8001 --workers "$WEB_CONCURRENCY" &
 BACKEND_PID=$!
 
 echo "Waiting for backend to start..."
@@ -651,7 +651,9 @@ const Signup = () => {
     e.preventDefault();
     setLoading(true);
     try {
-      await axios.post(`${API}/api/auth/signup`, formData);
+      // Stars reset at the member's local midnight
+      const timezone = Intl.DateTimeFormat().resolvedOptions().timeZone || "UTC";
+      await axios.post(`${API}/api/auth/signup`, { ...formData, timezone });
       setMessage("Registration successful! Please wait for admin approval.");
       setTimeout(() => navigate("/"), 2000);
     } catch (error) {
@@ -1003,12 +1005,91 @@ const AdminPanel = () => {
   useEffect(() => {
     fetchUsers();
     fetchStats();
+
+    // The live connection picks up changes made elsewhere; our own actions
+    // still refresh directly, since without a replica set or Redis each
+    // worker only reports its own writes
+    const controller = new AbortController();
+    let retry;
+    const connect = async () => {
+      try {
+        const response = await fetch(`${API}/api/admin/live`, {
+          headers: { Authorization: axios.defaults.headers.common["Authorization"] },
+          signal: controller.signal,
+        });
+        if (response.ok) {
+          const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+          let buffer = "";
+          for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += value;
+            let boundary;
+            while ((boundary = buffer.indexOf("\n\n")) >= 0) {
+              handleLiveMessage(buffer.slice(0, boundary));
+              buffer = buffer.slice(boundary + 2);
+            }
+          }
+        }
+      } catch (error) {
+        console.error("Live updates disconnected");
+      }
+      if (!controller.signal.aborted) {
+        retry = setTimeout(() => {
+          fetchUsers();
+          connect();
+        }, 5000);
+      }
+    };
+    connect();
+    return () => {
+      controller.abort();
+      clearTimeout(retry);
+    };
   }, []);
 
+  const handleLiveMessage = (message) => {
+    let event = null;
+    let data = null;
+    for (const line of message.split("\n")) {
+      if (line.startsWith("event: ")) event = line.slice(7);
+      else if (line.startsWith("data: ")) data = JSON.parse(line.slice(6));
+    }
+    if (event === "stats") setStats(data);
+    else if (event === "resync") fetchUsers();
+    else if (event === "updates") applyLiveUpdates(data);
+  };
+
+  const applyLiveUpdates = (events) => {
+    setUsers((current) => {
+      let next = current;
+      for (const event of events) {
+        if (event.type !== "user") continue;
+        const { user } = event;
+        if (event.op === "delete") {
+          next = next.filter((u) => u.id !== user.id);
+        } else if (next.some((u) => u.id === user.id)) {
+          next = next.map((u) => (u.id === user.id ? { ...u, ...user } : u));
+        } else if (user.username) {
+          next = [...next, user];
+        }
+      }
+      return next;
+    });
+  };
+
   const fetchUsers = async () => {
     try {
-      const response = await axios.get(`${API}/api/admin/users`);
-      setUsers(response.data);
+      const allUsers = [];
+      let after = null;
+      do {
+        const response = await axios.get(`${API}/api/admin/users`, {
+          params: { limit: 500, ...(after && { after }) },
+        });
+        allUsers.push(...response.data);
+        after = response.headers["x-next-cursor"];
+      } while (after);
+      setUsers(allUsers);
     } catch (error) {
       console.error("Failed to fetch users");
     }
@@ -1027,7 +1108,8 @@ const AdminPanel = () => {
   const updateUser = async (userId, updateData) => {
     try {
       await axios.put(`${API}/api/admin/users/${userId}`, updateData);
-      fetchUsers();
+      // Apply our own change directly: the live feed may come from another worker
+      applyLiveUpdates([{ type: "user", op: "update", user: { id: userId, ...updateData } }]);
       fetchStats();
     } catch (error) {
       console.error("Failed to update user");
@@ -1038,7 +1120,7 @@ const AdminPanel = () => {
     if (window.confirm("Are you sure you want to delete this user?")) {
       try {
         await axios.delete(`${API}/api/admin/users/${userId}`);
-        fetchUsers();
+        applyLiveUpdates([{ type: "user", op: "delete", user: { id: userId } }]);
         fetchStats();
       } catch (error) {
         console.error("Failed to delete user");
@@ -1074,8 +1156,12 @@ const AdminPanel = () => {
     ) {
       setLoading(true);
       try {
-        await axios.post(`${API}/api/admin/clear-workout-data`);
-        alert("All workout data has been cleared");
+        const response = await axios.post(`${API}/api/admin/clear-workout-data`);
+        alert(
+          response.data.status === "succeeded"
+            ? "All workout data has been cleared"
+            : "Clearing workout data has started and will finish in the background"
+        );
       } catch (error) {
         console.error("Failed to clear workout data");
         alert("Failed to clear workout data");
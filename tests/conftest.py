@@ -0,0 +1,39 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """The server module on a fresh mongomock database, with its process-wide state reset.
+
+    server.db and the singletons tests touch (token revocations, catalogue,
+    user and stats caches, shared state) are swapped for clean ones and
+    restored afterwards, so tests do not see each other's data.
+    """
+    pytest.importorskip("mongomock_motor")
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "silvergym_test")
+    from mongomock_motor import AsyncMongoMockClient
+
+    import server as module
+    from catalogue import ExerciseCatalogue
+    from revocations import TokenRevocations
+    from shared_state import SharedState
+
+    shared = SharedState()
+    for cache, handler in module.shared._handlers.items():
+        shared.on_invalidate(cache, handler)
+    monkeypatch.setattr(module, "db", AsyncMongoMockClient()["silvergym_test"])
+    monkeypatch.setattr(module, "token_revocations", TokenRevocations(module.ACCESS_TOKEN_LIFETIME))
+    monkeypatch.setattr(module, "catalogue", ExerciseCatalogue())
+    monkeypatch.setattr(module, "shared", shared)
+    module.user_cache.clear()
+    module.stats_cache.clear()
+    yield module
+    module.user_cache.clear()
+    module.stats_cache.clear()
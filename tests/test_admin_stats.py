@@ -0,0 +1,40 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import bson
+
+
+def test_bucket_boundaries_survive_bson_round_trip(server):
+    boundaries = server.pending_age_boundaries(datetime(2026, 3, 1, 12, 0, 0, 123456))
+    # What mongod sends back as bucket ids must equal what we look them up by
+    assert bson.decode(bson.encode({"b": boundaries}))["b"] == boundaries
+    assert boundaries == sorted(boundaries)
+
+
+def test_pending_age_histogram_counts_each_bucket(server):
+    async def run():
+        now = datetime.utcnow()
+        for days in [40, 10, 10, 5, 2, 0]:
+            user = server.User(username=f"pending{days}-{now.microsecond}", email=f"p{days}@example.com",
+                               password_hash="x", created_at=now - timedelta(days=days, hours=1))
+            await server.db.users.insert_one(user.dict())
+
+        stats = await server.compute_admin_stats()
+        assert stats["pending_approval"] == 6
+        assert stats["pending_age_histogram"] == {">30d": 1, "7-30d": 2, "3-7d": 1, "1-3d": 1, "<1d": 1}
+
+    asyncio.run(run())
+
+
+def test_runtime_stats_are_still_served_under_the_old_cache_stats_path(server):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(server.app)
+    token = server.create_access_token(data={"sub": "admin", "is_admin": True})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    current = client.get("/api/admin/runtime-stats", headers=headers)
+    old = client.get("/api/admin/cache-stats", headers=headers)
+
+    assert current.status_code == old.status_code == 200
+    assert set(old.json()) == set(current.json()) == {"user_cache", "password_pool", "admin_stats_cache"}
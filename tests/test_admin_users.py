@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+
+
+def test_user_listing_pages_by_cursor_and_hides_private_fields(server):
+    async def run():
+        start = datetime(2026, 1, 1)
+        users = [
+            server.User(username=f"member{i}", email=f"member{i}@example.com", password_hash="secret",
+                        created_at=start + timedelta(minutes=i // 2))
+            for i in range(5)
+        ]
+        await server.db.users.insert_many([{**user.dict(), "awards": ["award-1"]} for user in users])
+
+        seen, after = [], None
+        while True:
+            response = await server.get_all_users(
+                limit=2, after=after, user_status=None, payment_status=None, format=server.ListFormat.JSON, admin=True
+            )
+            page = orjson.loads(response.body)
+            assert len(page) <= 2
+            for user in page:
+                assert "password_hash" not in user and "awards" not in user and "_id" not in user
+            seen.extend(user["id"] for user in page)
+            after = response.headers.get("X-Next-Cursor")
+            if after is None:
+                break
+
+        # Signup order, ties broken by id, each member exactly once
+        assert seen == [user.id for user in sorted(users, key=lambda u: (u.created_at, u.id))]
+
+    asyncio.run(run())
+
+
+def test_user_listing_rejects_a_malformed_cursor(server):
+    from fastapi import HTTPException
+
+    async def run():
+        with pytest.raises(HTTPException) as error:
+            await server.get_all_users(
+                limit=2, after="not-a-cursor", user_status=None, payment_status=None, format=server.ListFormat.JSON, admin=True
+            )
+        assert error.value.status_code == 400
+
+    asyncio.run(run())
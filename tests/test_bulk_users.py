@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from jobs import JobQueue
+
+
+def test_bulk_update_reports_each_id_and_revokes_changed_status(server):
+    async def run():
+        await server.init_database()
+        pending = server.User(username="pending", email="pending@example.com", password_hash="x")
+        approved = server.User(username="approved", email="approved@example.com", password_hash="x", status="approved")
+        await server.db.users.insert_many([pending.dict(), approved.dict()])
+
+        result = await server.apply_bulk_user_update([pending.id, approved.id, "missing"], {"status": "approved"})
+
+        assert [r["result"] for r in result["results"]] == ["updated", "unchanged", "not_found"]
+        stored = await server.db.users.find_one({"id": pending.id})
+        assert stored["status"] == "approved" and stored["token_version"] == 1
+        assert server.token_revocations.is_revoked(pending.id, 0)
+        assert not server.token_revocations.is_revoked(approved.id, 0)
+
+    asyncio.run(run())
+
+
+def test_filter_bulk_job_pages_by_cursor_and_keeps_only_counts(server, monkeypatch):
+    async def run():
+        await server.init_database()
+        monkeypatch.setattr(server, "BULK_BATCH_SIZE", 2)
+        start = datetime(2026, 1, 1)
+        users = [
+            server.User(username=f"member{i}", email=f"member{i}@example.com", password_hash="x",
+                        created_at=start + timedelta(minutes=i // 2), payment_status="paid" if i == 3 else "unpaid")
+            for i in range(5)
+        ]
+        await server.db.users.insert_many([user.dict() for user in users])
+        queue = JobQueue(batch_pause=0)
+        queue.register("bulk_user_update", server.bulk_user_update_job)
+        job_id = await queue.enqueue(server.db, "bulk_user_update", {
+            "ids": None, "filter": {"status": "pending", "payment_status": None}, "changes": {"payment_status": "paid"},
+        })
+
+        await queue.execute(server.db, await queue.claim(server.db))
+
+        job = await queue.get(server.db, job_id)
+        assert job["status"] == "succeeded" and job["processed"] == job["total"] == 5
+        assert job["result"] == {
+            "matched": 5, "updated": 4, "unchanged": 1, "not_found": 0,
+            "skipped": [{"id": users[3].id, "result": "unchanged"}], "skipped_truncated": False,
+        }
+        stored = await server.db.admin_jobs.find_one({"_id": job_id})
+        assert "targets" not in stored["checkpoint"] and "results" not in stored["checkpoint"]
+        assert await server.db.users.count_documents({"payment_status": "paid"}) == 5
+
+    asyncio.run(run())
+
+
+def test_single_update_revokes_tokens_only_when_status_changes(server):
+    async def run():
+        await server.init_database()
+        member = server.User(username="member", email="member@example.com", password_hash="x", status="approved")
+        await server.db.users.insert_one(member.dict())
+
+        await server.update_user(member.id, server.UserUpdate(status="approved", payment_status="paid"), admin=True)
+        stored = await server.db.users.find_one({"id": member.id})
+        assert stored["payment_status"] == "paid" and stored["token_version"] == 0
+        assert not server.token_revocations.is_revoked(member.id, 0)
+
+        await server.update_user(member.id, server.UserUpdate(status="rejected"), admin=True)
+        stored = await server.db.users.find_one({"id": member.id})
+        assert stored["status"] == "rejected" and stored["token_version"] == 1
+        assert server.token_revocations.is_revoked(member.id, 0)
+
+    asyncio.run(run())
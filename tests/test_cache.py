@@ -0,0 +1,40 @@
+import asyncio
+
+from cache import TTLCache
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(maxsize=10, ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": "u1"}
+
+    async def run():
+        return await asyncio.gather(*[cache.get_or_load("u1", loader) for _ in range(20)])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r == {"id": "u1"} for r in results)
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 19
+
+
+def test_lru_eviction_and_invalidation():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    cache.invalidate("a")
+    assert cache.get("a") is None
+
+
+def test_expired_entries_are_reloaded():
+    cache = TTLCache(maxsize=10, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
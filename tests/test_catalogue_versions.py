@@ -0,0 +1,62 @@
+import asyncio
+
+from catalogue import ExerciseCatalogue
+
+
+def test_admin_changes_bump_the_revision_other_workers_poll(server):
+    async def run():
+        await server.init_database()
+        # Another worker's catalogue, fed only by polling
+        other = ExerciseCatalogue()
+        await other.reload(server.db)
+        before = other.snapshot
+        assert not await other.refresh(server.db)
+
+        created = await server.create_exercise(
+            server.ExerciseCreate(name="Sled Push", description="Drive the sled.", level="advanced", tags=["legs"]), True
+        )
+        exercise_id = created["exercise"]["id"]
+        assert created["revision"] == before.revision + 1
+        assert server.catalogue.get(exercise_id)["level"] == "advanced"
+
+        assert await other.refresh(server.db)
+        assert other.revision == created["revision"]
+        assert other.search.search("sled")["total"] == 1
+        # The old snapshot is untouched; readers holding it see a consistent list
+        assert before.by_id.get(exercise_id) is None
+
+        await server.update_exercise(exercise_id, server.ExerciseUpdate(level="beginner"), True)
+        await server.delete_exercise(exercise_id, True)
+        assert await other.refresh(server.db)
+        assert other.revision == created["revision"] + 2
+        assert other.get(exercise_id) is None
+        assert other.search.search("sled")["total"] == 0
+
+    asyncio.run(run())
+
+
+def test_level_listing_answers_304_for_a_current_etag(server):
+    from starlette.requests import Request
+
+    def request(if_none_match=None):
+        headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+        return Request({"type": "http", "method": "GET", "path": "/api/exercises/beginner", "headers": headers})
+
+    async def run():
+        await server.init_database()
+        member = server.MemberClaims(id="member", status="approved")
+        level = server.ExerciseLevel.BEGINNER
+
+        first = await server.get_exercises(level, request(), member)
+        etag = first.headers["ETag"]
+        assert first.status_code == 200 and first.body and first.headers["Cache-Control"] == "private, no-cache"
+
+        cached = await server.get_exercises(level, request(f'"other", W/{etag}'), member)
+        assert cached.status_code == 304 and cached.body == b"" and cached.headers["ETag"] == etag
+
+        # Once the level changes the old tag no longer matches
+        await server.create_exercise(server.ExerciseCreate(name="Wall Sit", description="Hold it.", level="beginner"), True)
+        changed = await server.get_exercises(level, request(etag), member)
+        assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+    asyncio.run(run())
@@ -0,0 +1,129 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def test_parallel_completions_award_one_star(server):
+    async def run():
+        await server.init_database()
+        user = server.User(username="member", email="member@example.com", password_hash="x")
+        await server.db.users.insert_one(user.dict())
+
+        # mongomock runs each operation to completion before the next, so this
+        # checks the outcome of many taps, not the interleaving a real mongod
+        # allows; the unique index is what settles that race in production
+        results = await asyncio.gather(*[server.record_completion(user.id, "ex-1") for _ in range(100)])
+
+        assert results.count(True) == 1
+        stored = await server.db.users.find_one({"id": user.id})
+        assert stored["total_stars"] == 1
+        assert await server.db.progress.count_documents({"user_id": user.id}) == 1
+        summary = await server.db.progress_history.find_one({"user_id": user.id})
+        assert summary["completed"] == 1
+        assert summary["stars"] == 1
+
+    asyncio.run(run())
+
+
+def test_stalled_award_is_finished_once_by_reconciliation(server):
+    async def run():
+        await server.init_database()
+        user = server.User(username="member", email="member@example.com", password_hash="x")
+        await server.db.users.insert_one(user.dict())
+        exercise_ids = ["ex-1", "ex-2"]
+        day = server.day_key()
+        written = datetime.utcnow() - server.AWARD_GRACE - timedelta(seconds=1)
+        rows = [server.progress_row(user.id, ex_id, day, "award-1", written) for ex_id in exercise_ids]
+        await server.db.progress.insert_many(rows)
+        # The worker died after the star and half of the rankings, before the summary
+        await server.db.users.update_one({"id": user.id}, server.award_stars_update(day, 2, "award-1"))
+        await server.leaderboard.record(server.db, user.id, day, 2, {}, award="award-1")
+
+        # Tapping again is refused but finishes the stalled award
+        assert not await server.record_completion(user.id, exercise_ids[0])
+        assert await server.reconcile_awards() == {"awards_confirmed": 0, "awards_reconciled": 0}
+        # Applying it yet again changes nothing
+        await server.award_completions(user.id, day, "award-1", exercise_ids, 2)
+
+        stored = await server.db.users.find_one({"id": user.id})
+        assert stored["total_stars"] == 2
+        summary = await server.db.progress_history.find_one({"user_id": user.id, "day": day})
+        assert summary["completed"] == 2 and summary["stars"] == 2 and summary["streak"] == 1
+        totals = await server.db.progress_totals.find_one({"user_id": user.id})
+        assert totals["stars"] == 2 and totals["active_days"] == 1
+        entry = await server.db.leaderboard_entries.find_one({"user_id": user.id, "board": "all_time", "level": "all"})
+        assert entry["stars"] == 2
+        assert await server.db.progress.count_documents({"award_pending": True}) == 0
+
+    asyncio.run(run())
+
+
+def test_sweep_confirms_finished_awards_without_applying_them_again(server):
+    async def run():
+        await server.init_database()
+        user = server.User(username="member", email="member@example.com", password_hash="x")
+        await server.db.users.insert_one(user.dict())
+        today = datetime.utcnow()
+        yesterday = server.day_key(today - timedelta(days=1))
+        await server.db.progress_history.insert_one({"user_id": user.id, "day": yesterday, "streak": 3})
+
+        assert await server.record_completion(user.id, "ex-1")
+        assert await server.record_completion(user.id, "ex-2")
+        # Rows stay pending until the sweep has seen every write of their award
+        assert await server.db.progress.count_documents({"award_pending": True}) == 2
+        later = today + server.AWARD_GRACE + timedelta(seconds=1)
+        assert await server.reconcile_awards(now=later) == {"awards_confirmed": 2, "awards_reconciled": 0}
+        assert await server.db.progress.count_documents({"award_pending": True}) == 0
+
+        summary = await server.db.progress_history.find_one({"user_id": user.id, "day": server.day_key(today)})
+        assert summary["exercise_ids"] == ["ex-1", "ex-2"] and summary["streak"] == 4
+        totals = await server.db.progress_totals.find_one({"user_id": user.id})
+        assert totals["stars"] == 2 and totals["active_days"] == 1 and totals["longest_streak"] == 4
+
+    asyncio.run(run())
+
+
+def test_batch_splits_new_and_already_completed_exercises(server):
+    async def run():
+        await server.init_database()
+        user = server.User(username="member", email="member@example.com", password_hash="x")
+        await server.db.users.insert_one(user.dict())
+        member = server.MemberClaims(id=user.id, status="approved")
+        first, second, third = [exercise["id"] for exercise in server.catalogue.snapshot.by_id.values()][:3]
+        assert await server.record_completion(user.id, first)
+
+        # A repeated id in one request counts once
+        result = await server.complete_exercise_batch(
+            server.CompleteBatchRequest(exercise_ids=[first, second, third, second]), member
+        )
+
+        assert result["completed"] == [second, third]
+        assert result["already_completed"] == [first]
+        assert result["stars_earned"] == 2
+        stored = await server.db.users.find_one({"id": user.id})
+        assert stored["total_stars"] == 3
+        assert await server.db.progress.count_documents({"user_id": user.id}) == 3
+        summary = await server.db.progress_history.find_one({"user_id": user.id})
+        assert summary["completed"] == 3 and sorted(summary["exercise_ids"]) == sorted([first, second, third])
+
+    asyncio.run(run())
+
+
+def test_batch_with_an_unknown_exercise_records_nothing(server):
+    from fastapi import HTTPException
+
+    async def run():
+        await server.init_database()
+        user = server.User(username="member", email="member@example.com", password_hash="x")
+        await server.db.users.insert_one(user.dict())
+        member = server.MemberClaims(id=user.id, status="approved")
+        known = next(iter(server.catalogue.snapshot.by_id))
+
+        with pytest.raises(HTTPException) as error:
+            await server.complete_exercise_batch(server.CompleteBatchRequest(exercise_ids=[known, "no-such-exercise"]), member)
+
+        assert error.value.status_code == 400 and "no-such-exercise" in error.value.detail
+        assert await server.db.progress.count_documents({}) == 0
+
+    asyncio.run(run())
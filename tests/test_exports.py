@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import exports
+
+
+async def documents(count):
+    for i in range(count):
+        yield {"user_id": f"u{i}", "day": "2026-01-07", "exercise_ids": ["a", "b"], "completed_date": datetime(2026, 1, 7, 8)}
+
+
+def collect(cursor, fields, fmt):
+    async def run():
+        return [chunk async for chunk in exports.stream_rows(cursor, fields, fmt)]
+    return asyncio.run(run())
+
+
+def test_csv_export_streams_one_chunk_per_batch():
+    chunks = collect(documents(exports.EXPORT_BATCH_SIZE + 1), ["user_id", "exercise_ids", "completed_date"], "csv")
+    assert len(chunks) == 2
+    lines = "".join(chunks).splitlines()
+    assert lines[0] == "user_id,exercise_ids,completed_date"
+    assert lines[1] == "u0,a;b,2026-01-07T08:00:00"
+    assert len(lines) == exports.EXPORT_BATCH_SIZE + 2
+
+
+def test_ndjson_export_keeps_only_requested_fields():
+    chunks = collect(documents(2), ["day", "completed_date"], "ndjson")
+    assert "".join(chunks).splitlines()[0] == '{"day": "2026-01-07", "completed_date": "2026-01-07T08:00:00"}'
+
+
+def test_unknown_fields_are_rejected():
+    assert exports.parse_fields("username, email", exports.USER_FIELDS) == ["username", "email"]
+    with pytest.raises(ValueError):
+        exports.parse_fields("username,password_hash", exports.USER_FIELDS)
+
+
+def test_csv_neutralises_spreadsheet_formulas():
+    async def members():
+        for username in ["=HYPERLINK(\"http://x\")", "@SUM(A1)", "+1", "-2", "\tx", "plain"]:
+            yield {"username": username, "total_stars": -1}
+
+    lines = "".join(collect(members(), ["username", "total_stars"], "csv")).splitlines()
+    assert lines[1:] == ['"\'=HYPERLINK(""http://x"")",-1', "'@SUM(A1),-1", "'+1,-1", "'-2,-1", "'\tx,-1", "plain,-1"]
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+import pytest
+
+from hashing import PasswordHasher, PasswordPoolSaturated
+
+
+def test_full_queue_is_shed_with_a_retry_hint():
+    async def run():
+        hasher = PasswordHasher(workers=1, max_queue=1, retry_after=7)
+        # One job holds the only worker and one waits for it; the queue is full
+        running = asyncio.ensure_future(hasher._run(time.sleep, 0.2))
+        waiting = asyncio.ensure_future(hasher._run(time.sleep, 0))
+        await asyncio.sleep(0.05)
+        assert hasher.running == 1 and hasher.waiting == 1
+
+        with pytest.raises(PasswordPoolSaturated) as error:
+            await hasher.hash("secret")
+        assert error.value.retry_after == 7
+
+        await asyncio.gather(running, waiting)
+        assert hasher.stats()["rejected"] == 1 and hasher.stats()["completed"] == 2
+        hasher.shutdown()
+
+    asyncio.run(run())
+
+
+def test_saturated_pool_answers_503_with_retry_after(server, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    async def saturated(*args):
+        raise PasswordPoolSaturated(7)
+
+    async def run():
+        user = server.User(username="member", email="member@example.com", password_hash="x")
+        await server.db.users.insert_one(user.dict())
+
+    asyncio.run(run())
+    monkeypatch.setattr(server.password_hasher, "verify", saturated)
+
+    response = TestClient(server.app).post("/api/auth/login", json={"username": "member", "password": "secret"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert response.json() == {"detail": "Server is busy, please retry shortly"}
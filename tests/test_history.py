@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+import summaries  # noqa: E402
+
+LEVELS = ["beginner", "intermediate", "advanced"]
+
+
+def test_history_and_streaks_come_from_daily_rollups():
+    async def run():
+        db = AsyncMongoMockClient()["history"]
+        # Active on the 1st-3rd, a gap, then the 5th-6th
+        for day in ["2026-03-01", "2026-03-02", "2026-03-03", "2026-03-05", "2026-03-06"]:
+            await summaries.record(db, "u1", day, ["a"], 1, {"beginner": 1})
+        await summaries.record(db, "u1", "2026-03-06", ["b", "c"], 2, {"advanced": 2})
+
+        history = await summaries.history(db, "u1", "2026-03-02", "2026-03-06", LEVELS)
+        assert [d["day"] for d in history["days"]] == ["2026-03-02", "2026-03-03", "2026-03-05", "2026-03-06"]
+        assert history["days"][-1]["levels"] == {"beginner": 1, "advanced": 2}
+        assert history["totals"] == {
+            "active_days": 4,
+            "stars": 6,
+            "completed": 6,
+            "levels": {"beginner": 4, "intermediate": 0, "advanced": 2},
+        }
+
+        # The streak to the 6th is still current on the 7th
+        streaks = await summaries.streaks(db, "u1", "2026-03-07", "2026-03-01", "2026-03-07")
+        assert streaks["current"] == {"days": 2, "since": "2026-03-05", "completed_today": False}
+        assert streaks["longest"] == {"days": 3, "ended": "2026-03-03"}
+        assert streaks["all_time"]["longest_streak"] == 3
+        assert streaks["all_time"]["active_days"] == 5
+
+        # Only the days inside the range count towards its longest streak
+        clipped = await summaries.streaks(db, "u1", "2026-03-09", "2026-03-03", "2026-03-06")
+        assert clipped["current"]["days"] == 0
+        assert clipped["longest"] == {"days": 2, "ended": "2026-03-06"}
+
+    asyncio.run(run())
+
+
+def test_check_rebuilds_whole_summaries_and_following_streaks():
+    async def run():
+        db = AsyncMongoMockClient()["history_check"]
+        level_of = {"a": "beginner", "b": "advanced"}.get
+        for day in ["2026-03-01", "2026-03-03"]:
+            await summaries.record(db, "u1", day, ["a"], 1, {"beginner": 1})
+        # 03-02 was completed but its summary never written; 03-03 then started a new streak
+        for exercise_id in ["a", "b"]:
+            await db.progress.insert_one({"user_id": "u1", "exercise_id": exercise_id, "day": "2026-03-02", "stars_earned": 1})
+        # u2's summary has the right stars but lost its level counts
+        await db.progress.insert_one({"user_id": "u2", "exercise_id": "b", "day": "2026-03-02", "stars_earned": 1})
+        await summaries.record(db, "u2", "2026-03-02", ["b"], 1)
+        # u3's award is still being written, so it is not judged yet
+        await db.progress.insert_one(
+            {"user_id": "u3", "exercise_id": "a", "day": "2026-03-02", "stars_earned": 1, "award_pending": True}
+        )
+
+        report = await summaries.check(db, "2026-03-02", level_of=level_of)
+        assert (report["missing"], report["mismatched"], report["pending"]) == (["u1"], ["u2"], ["u3"])
+
+        report = await summaries.check(db, "2026-03-02", repair=True, level_of=level_of)
+        assert report["repaired"] == 2
+        assert await summaries.check(db, "2026-03-02", level_of=level_of) == {
+            "day": "2026-03-02", "mismatched": [], "missing": [], "orphaned": [], "pending": ["u3"], "repaired": 0,
+        }
+
+        rebuilt = await db.progress_history.find_one({"user_id": "u1", "day": "2026-03-02"})
+        assert rebuilt["levels"] == {"beginner": 1, "advanced": 1} and rebuilt["streak"] == 2
+        following = await db.progress_history.find_one({"user_id": "u1", "day": "2026-03-03"})
+        assert following["streak"] == 3
+        streaks = await summaries.streaks(db, "u1", "2026-03-03", "2026-03-01", "2026-03-03")
+        assert streaks["all_time"]["longest_streak"] == 3 and streaks["all_time"]["active_days"] == 3
+        history = await summaries.history(db, "u1", "2026-03-01", "2026-03-03", LEVELS)
+        assert history["totals"]["stars"] == 4
+
+    asyncio.run(run())
+
+
+def test_check_endpoint_rejects_malformed_days(server):
+    from fastapi import HTTPException
+
+    async def run():
+        for day in ["garbage", "2026-13-01", "2026-02-30"]:
+            with pytest.raises(HTTPException) as error:
+                await server.check_daily_summaries(day=day, admin=True)
+            assert error.value.status_code == 400
+        report = await server.check_daily_summaries(day="2026-03-02", admin=True)
+        assert report["day"] == "2026-03-02"
+
+    asyncio.run(run())
@@ -0,0 +1,202 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+import jobs  # noqa: E402
+from jobs import JobQueue  # noqa: E402
+
+
+def test_job_resumes_from_checkpoint_after_lease_lapses():
+    async def run():
+        db = AsyncMongoMockClient()["jobs"]
+        await db.items.insert_many([{"n": i} for i in range(5)])
+        calls = []
+
+        async def clear_items(ctx):
+            calls.append(dict(ctx.checkpoint))
+            await ctx.run_steps([
+                lambda: ctx.delete_batches(db.items, {}),
+                lambda: db.items.insert_one({"n": "marker"}),
+            ])
+            return {"processed": ctx.processed}
+
+        first = JobQueue(batch_size=2, batch_pause=0)
+        first.register("clear_items", clear_items)
+        job_id = await first.enqueue(db, "clear_items", {})
+        # The first worker dies after saving the first step, leaving the job running
+        await first.claim(db)
+        await db.admin_jobs.update_one({"_id": job_id}, {"$set": {"checkpoint": {"step": 1}, "processed": 5}})
+        await db.items.delete_many({"n": {"$ne": "marker"}})
+
+        second = JobQueue(batch_size=2, batch_pause=0)
+        second.register("clear_items", clear_items)
+        assert await second.claim(db) is None
+
+        await db.admin_jobs.update_one({"_id": job_id}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+        job = await second.claim(db)
+        assert job["attempts"] == 2 and job["worker"] == second.worker_id
+        await second.execute(db, job)
+
+        finished = await second.get(db, job_id)
+        assert finished["status"] == "succeeded" and finished["result"] == {"processed": 5}
+        assert calls == [{"step": 1}]
+        assert await db.items.count_documents({"n": "marker"}) == 1
+
+    asyncio.run(run())
+
+
+def test_job_gives_up_after_max_attempts():
+    async def run():
+        db = AsyncMongoMockClient()["jobs"]
+        queue = JobQueue(max_attempts=1)
+
+        async def noop(ctx):
+            return {}
+
+        queue.register("noop", noop)
+        job_id = await queue.enqueue(db, "noop", {})
+        await db.admin_jobs.update_one({"_id": job_id}, {"$set": {"attempts": 1}})
+        await queue.execute(db, await queue.claim(db))
+
+        job = await queue.get(db, job_id)
+        assert job["status"] == "failed" and "Gave up" in job["error"]
+
+    asyncio.run(run())
+
+
+async def steal(db, job_id):
+    """Let the job's lease lapse and have another worker claim it."""
+    await db.admin_jobs.update_one({"_id": job_id}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+    thief = JobQueue()
+    job = await thief.claim(db)
+    assert job["_id"] == job_id
+    return thief
+
+
+def test_worker_stops_when_its_lease_is_stolen_mid_job():
+    async def run():
+        db = AsyncMongoMockClient()["jobs"]
+        await db.items.insert_many([{"n": i} for i in range(6)])
+        queue = JobQueue(batch_size=2, batch_pause=0)
+        thieves = []
+
+        async def clear_items(ctx):
+            await ctx.save(total=6)
+            thieves.append(await steal(db, ctx.job_id))
+            await ctx.delete_batches(db.items, {})
+            return {"processed": ctx.processed}
+
+        queue.register("clear_items", clear_items)
+        job_id = await queue.enqueue(db, "clear_items", {})
+        await queue.execute(db, await queue.claim(db))
+
+        # One batch went before the first checkpoint noticed; nothing after it
+        assert await db.items.count_documents({}) == 4
+        job = await queue.get(db, job_id)
+        assert job["status"] == "running" and job["worker"] == thieves[0].worker_id
+        assert job["processed"] == 0 and "finished_at" not in job
+
+    asyncio.run(run())
+
+
+def test_heartbeat_keeps_a_long_step_leased_and_notices_theft():
+    async def run():
+        db = AsyncMongoMockClient()["jobs"]
+        queue = JobQueue(lease_seconds=0.3)
+        other = JobQueue()
+        outcomes = []
+
+        async def long_step(ctx):
+            # Never checkpoints; only the heartbeat keeps the lease alive
+            await asyncio.sleep(0.5)
+            outcomes.append(await other.claim(db))
+            await steal(db, ctx.job_id)
+            await asyncio.sleep(1)
+            outcomes.append("not cancelled")
+            return {}
+
+        queue.register("long_step", long_step)
+        job_id = await queue.enqueue(db, "long_step", {})
+        await asyncio.wait_for(queue.execute(db, await queue.claim(db)), timeout=2)
+
+        assert outcomes == [None]
+        job = await queue.get(db, job_id)
+        assert job["status"] == "running" and "finished_at" not in job
+
+    asyncio.run(run())
+
+
+def test_worker_survives_a_failed_outcome_write(monkeypatch):
+    async def run():
+        db = AsyncMongoMockClient()["jobs"]
+        queue = JobQueue(poll_seconds=0.01, lease_seconds=0.2)
+        done, failures = [], []
+
+        async def work(ctx):
+            done.append(ctx.params["n"])
+            return {}
+
+        original = queue._finish
+
+        async def flaky_finish(db, job, outcome):
+            # Mongo stays unreachable for every retry of the first outcome
+            if not failures:
+                failures.append(job["_id"])
+                raise ConnectionError("mongod went away")
+            await original(db, job, outcome)
+
+        monkeypatch.setattr(queue, "_finish", flaky_finish)
+        queue.register("work", work)
+        first = await queue.enqueue(db, "work", {"n": 1})
+        second = await queue.enqueue(db, "work", {"n": 2})
+        queue.start(db)
+        try:
+            for _ in range(200):
+                states = [(await queue.get(db, job_id))["status"] for job_id in (first, second)]
+                if states == ["succeeded", "succeeded"]:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await queue.stop()
+
+        assert states == ["succeeded", "succeeded"]
+        # The first job ran again once its lease lapsed
+        assert failures == [first] and done.count(1) == 2 and done.count(2) == 1
+
+    asyncio.run(run())
+
+
+def test_outcome_write_is_retried(monkeypatch):
+    async def run():
+        db = AsyncMongoMockClient()["jobs"]
+        monkeypatch.setattr(jobs, "FINISH_RETRY_DELAYS", (0, 0))
+        queue = JobQueue()
+
+        async def work(ctx):
+            return {"ok": True}
+
+        queue.register("work", work)
+        job_id = await queue.enqueue(db, "work", {})
+        job = await queue.claim(db)
+        real_db, attempts = db, []
+
+        class FlakyJobs:
+            async def update_one(self, *args, **kwargs):
+                attempts.append(1)
+                if len(attempts) < 3:
+                    raise ConnectionError("mongod went away")
+                return await real_db.admin_jobs.update_one(*args, **kwargs)
+
+        class FlakyDb:
+            admin_jobs = FlakyJobs()
+
+        await queue._finish(FlakyDb(), job, {"status": "succeeded", "result": {"ok": True}})
+        assert len(attempts) == 3
+        assert (await queue.get(db, job_id))["status"] == "succeeded"
+
+    asyncio.run(run())
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from leaderboard import Leaderboard
+
+pytest.importorskip("mongomock_motor")
+
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+
+async def seed(db, board):
+    for i, stars in enumerate([5, 9, 1, 7, 3]):
+        await db.users.insert_one({"id": f"u{i}", "username": f"member{i}"})
+        await board.record(db, f"u{i}", "2026-01-07", stars, {"beginner": stars})
+
+
+def test_top_and_own_rank_from_mongo():
+    async def run():
+        db = AsyncMongoMockClient()["leaderboard"]
+        board = Leaderboard()
+        await seed(db, board)
+
+        result = await board.ranking(db, "weekly", None, "2026-01-08", "u4", limit=3)
+        assert result["board"] == "weekly:2026-W02"
+        assert [(e["username"], e["stars"]) for e in result["top"]] == [("member1", 9), ("member3", 7), ("member0", 5)]
+        assert result["me"] == {"rank": 4, "stars": 3}
+
+        result = await board.ranking(db, "daily", "advanced", "2026-01-07", "u4", limit=3)
+        assert result["top"] == [] and result["me"] is None
+
+    asyncio.run(run())
+
+
+def test_redis_sorted_sets_match_mongo_and_rebuild():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def run():
+        db = AsyncMongoMockClient()["leaderboard_redis"]
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        board = Leaderboard(redis)
+        await seed(db, board)
+
+        from_redis = await board.ranking(db, "all_time", "beginner", "2026-01-07", "u0", limit=10)
+        from_mongo = await Leaderboard().ranking(db, "all_time", "beginner", "2026-01-07", "u0", limit=10)
+        assert from_redis == from_mongo
+        assert from_redis["me"] == {"rank": 3, "stars": 5}
+
+        await redis.flushall()
+        assert await board.rebuild_redis(db) == 5 * 3 * 2
+        assert await board.ranking(db, "all_time", "beginner", "2026-01-07", "u0", limit=10) == from_mongo
+
+    asyncio.run(run())
+
+
+def test_ties_rank_the_same_on_both_backends():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def run():
+        db = AsyncMongoMockClient()["leaderboard_ties"]
+        board = Leaderboard(fakeredis.FakeAsyncRedis(decode_responses=True))
+        for user_id in ["ua", "uc", "ub", "ud"]:
+            await db.users.insert_one({"id": user_id, "username": user_id})
+            await board.record(db, user_id, "2026-01-07", 4 if user_id == "ud" else 2, {})
+
+        from_redis = await board.ranking(db, "all_time", None, "2026-01-07", "ub", limit=10)
+        from_mongo = await Leaderboard().ranking(db, "all_time", None, "2026-01-07", "ub", limit=10)
+        assert from_redis == from_mongo
+        assert [e["username"] for e in from_mongo["top"]] == ["ud", "uc", "ub", "ua"]
+        assert from_mongo["me"] == {"rank": 3, "stars": 2}
+
+    asyncio.run(run())
+
+
+def test_deep_ranks_in_mongo_stop_counting_at_the_limit():
+    async def run():
+        db = AsyncMongoMockClient()["leaderboard_deep"]
+        board = Leaderboard(rank_count_limit=3)
+        await seed(db, board)
+
+        result = await board.ranking(db, "all_time", None, "2026-01-07", "u2", limit=2)
+        assert result["me"] == {"rank": None, "rank_beyond": 3, "stars": 1}
+        result = await board.ranking(db, "all_time", None, "2026-01-07", "u0", limit=2)
+        assert result["me"] == {"rank": 3, "stars": 5}
+
+    asyncio.run(run())
@@ -0,0 +1,32 @@
+import asyncio
+
+from live import LiveEvents, completion_event, user_event
+
+
+def test_bursts_coalesce_per_member_and_overflow_asks_for_resync():
+    async def run():
+        bus = LiveEvents(max_pending=2)
+        subscription = bus.subscribe()
+
+        bus.emit(user_event({"id": "u1", "status": "approved", "password_hash": "x"}))
+        bus.emit(user_event({"id": "u1", "payment_status": "paid"}))
+        bus.emit(completion_event("u1", ["a"], 1))
+        bus.emit(completion_event("u1", ["b"], 1))
+        assert subscription.ready.is_set()
+        events, overflowed = subscription.drain()
+        assert not overflowed
+        assert events == [
+            {"type": "user", "op": "upsert", "user": {"id": "u1", "status": "approved", "payment_status": "paid"}},
+            {"type": "completion", "user_id": "u1", "exercise_ids": ["a", "b"], "stars": 2},
+        ]
+
+        for i in range(3):
+            bus.emit(user_event({"id": f"u{i}", "status": "approved"}))
+        assert subscription.drain() == ([], True)
+
+        # A change stream reports writes itself; route events would be duplicates
+        bus.source = "change_stream"
+        bus.emit(user_event({"id": "u1"}))
+        assert not subscription.ready.is_set()
+
+    asyncio.run(run())
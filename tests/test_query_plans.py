@@ -0,0 +1,31 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from indexes import INDEXES, ensure_indexes, find_collscans
+
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_MONGO_URL, reason="TEST_MONGO_URL not set; explain plans need a real mongod")
+
+
+def test_hot_routes_do_not_collscan():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(TEST_MONGO_URL)
+        db = client[f"silvergym_test_{uuid.uuid4().hex[:8]}"]
+        try:
+            report = await ensure_indexes(db)
+            assert report["mismatched"] == []
+            assert len(report["created"]) == sum(len(specs) for specs in INDEXES.values())
+            assert await find_collscans(db) == []
+            # Second run is a no-op.
+            assert (await ensure_indexes(db))["created"] == []
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    asyncio.run(run())
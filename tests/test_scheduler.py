@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+from scheduler import Scheduler, daily_at  # noqa: E402
+
+
+def test_one_leader_runs_each_slot_once():
+    async def run():
+        db = AsyncMongoMockClient()["scheduler"]
+        calls = []
+
+        async def job(slot):
+            calls.append(slot)
+            return {"slot": slot.isoformat()}
+
+        workers = [Scheduler(lease_seconds=30) for _ in range(3)]
+        for worker in workers:
+            worker.db = db
+            worker.register("daily_rollover", daily_at(0, 0, 5), job)
+
+        now = datetime(2026, 1, 2, 0, 1)
+        leaders = [await worker.acquire_lease(now) for worker in workers]
+        assert leaders.count(True) == 1
+
+        # Even a stale second leader cannot run a slot that was already claimed
+        assert sum([await worker.run_due(now) for worker in workers]) == 1
+        assert calls == [datetime(2026, 1, 2, 0, 0, 5)]
+
+        # The lease expires; another worker takes over and catches up on the missed day
+        later = now + timedelta(days=1, minutes=5)
+        follower = workers[leaders.index(False)]
+        assert await follower.acquire_lease(later)
+        assert await follower.run_due(later) == 1
+        assert calls[-1] == datetime(2026, 1, 3, 0, 0, 5)
+
+        runs = await db.job_runs.find({}).to_list(None)
+        assert [r["status"] for r in runs] == ["succeeded", "succeeded"]
+        assert runs[-1]["caught_up"] is True
+
+    asyncio.run(run())
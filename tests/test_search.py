@@ -0,0 +1,45 @@
+from search import SearchIndex
+
+
+def exercise(exercise_id, name, description, level="beginner", tags=()):
+    return {"id": exercise_id, "name": name, "description": description, "level": level, "tags": list(tags)}
+
+
+CATALOGUE = [
+    exercise("1", "Push-ups", "Upper body push from plank.", tags=["chest"]),
+    exercise("2", "Archer Push-ups", "Push-up shifting weight to one arm.", "advanced", ["chest"]),
+    exercise("3", "Front Squats", "Squat holding a barbell.", "advanced", ["legs", "barbell"]),
+    exercise("4", "Plank", "Hold a straight body.", tags=["core"]),
+]
+
+
+def test_prefix_search_ranks_names_first_and_counts_facets():
+    index = SearchIndex()
+    index.sync(CATALOGUE)
+
+    result = index.search("push", facets=True)
+    assert [r["id"] for r in result["results"]] == ["1", "2"]
+    assert result["facets"]["level"] == {"beginner": 1, "advanced": 1}
+    # Facets are only counted when asked for, and a page can start further down
+    assert "facets" not in index.search("push")
+    page = index.search("push", limit=1, offset=1)
+    assert page["total"] == 2 and [r["id"] for r in page["results"]] == ["2"]
+
+    # Every token must match; "pla" is a prefix of "plank"
+    assert [r["id"] for r in index.search("push pla")["results"]] == ["1"]
+    assert [r["id"] for r in index.search("squ", level="advanced", tag="barbell")["results"]] == ["3"]
+    assert index.search("squ", level="beginner")["total"] == 0
+    # Without text the filters alone select, in name order
+    assert [r["id"] for r in index.search(tag="chest")["results"]] == ["2", "1"]
+
+
+def test_sync_applies_only_changes():
+    index = SearchIndex()
+    index.sync(CATALOGUE)
+
+    renamed = exercise("4", "Side Hold", "Hold on one forearm.", tags=["core"])
+    assert index.sync(CATALOGUE[:2] + [renamed]) == {"changed": 1, "removed": 1}
+
+    assert index.search("straight")["total"] == 0
+    assert "squat" not in index.postings and "barbell" not in index.by_tag
+    assert [r["id"] for r in index.search("side")["results"]] == ["4"]
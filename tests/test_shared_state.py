@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from shared_state import LocalRateLimiter, SharedState
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def make_redis(server):
+    return fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+
+
+def test_local_rate_limiter_refuses_past_burst():
+    async def run():
+        limiter = LocalRateLimiter("login", rate=1 / 60, burst=3)
+        results = [await limiter.allow("10.0.0.1") for _ in range(4)]
+        assert [allowed for allowed, _ in results] == [True, True, True, False]
+        assert results[-1][1] > 0
+        assert (await limiter.allow("10.0.0.2"))[0]
+
+    asyncio.run(run())
+
+
+def test_redis_rate_limiter_is_shared_between_processes():
+    async def run():
+        server = fakeredis.FakeServer()
+        first = SharedState(make_redis(server)).rate_limiter("signup", rate=1 / 60, burst=2)
+        second = SharedState(make_redis(server)).rate_limiter("signup", rate=1 / 60, burst=2)
+        assert (await first.allow("10.0.0.1"))[0]
+        assert (await second.allow("10.0.0.1"))[0]
+        allowed, retry_after = await first.allow("10.0.0.1")
+        assert not allowed
+        assert retry_after > 0
+
+    asyncio.run(run())
+
+
+def test_invalidation_reaches_other_processes():
+    async def run():
+        server = fakeredis.FakeServer()
+        writer, reader = SharedState(make_redis(server)), SharedState(make_redis(server))
+        seen = []
+        reader.on_invalidate("users", lambda message: seen.append(message["key"]))
+        reader.start()
+        await asyncio.sleep(0.05)
+
+        await writer.set_json("users:u1", '{"id": "u1"}', ttl=30)
+        assert await reader.get_json("users:u1") == {"id": "u1"}
+        await writer.invalidate("users", "u1")
+        for _ in range(50):
+            if seen:
+                break
+            await asyncio.sleep(0.01)
+
+        assert seen == ["u1"]
+        assert await reader.get_json("users:u1") is None
+        await writer.close()
+        await reader.close()
+
+    asyncio.run(run())
+
+
+def test_load_overtaken_by_invalidation_is_not_cached():
+    async def run():
+        server = fakeredis.FakeServer()
+        reader, writer = SharedState(make_redis(server)), SharedState(make_redis(server))
+
+        # The reader loads the user, then an invalidation lands before it writes
+        generation = await reader.generation("users:u1")
+        await writer.invalidate("users", "u1")
+        await reader.set_json("users:u1", '{"id": "u1", "status": "approved"}', ttl=30, generation=generation)
+        assert await reader.get_json("users:u1") is None
+
+        # Dropping the whole cache counts too
+        generation = await reader.generation("users:u1")
+        await writer.invalidate("users")
+        await reader.set_json("users:u1", '{"id": "u1"}', ttl=30, generation=generation)
+        assert await reader.get_json("users:u1") is None
+
+        generation = await reader.generation("users:u1")
+        await reader.set_json("users:u1", '{"id": "u1"}', ttl=30, generation=generation)
+        assert await reader.get_json("users:u1") == {"id": "u1"}
+        await writer.close()
+        await reader.close()
+
+    asyncio.run(run())
+
+
+def test_without_redis_everything_stays_local():
+    async def run():
+        state = SharedState()
+        seen = []
+        state.on_invalidate("stats", lambda message: seen.append(message["key"]))
+        await state.set_json("users:u1", "{}", ttl=30)
+        assert await state.get_json("users:u1") is None
+        assert await state.generation("users:u1") is None
+        await state.invalidate("stats")
+        assert seen == [None]
+        assert isinstance(state.rate_limiter("login", 1, 1), LocalRateLimiter)
+
+    asyncio.run(run())
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from timezones import DayWindows, is_valid_zone
+
+
+def test_day_window_follows_local_midnight():
+    windows = DayWindows()
+    assert windows.day_key("Asia/Kolkata", datetime(2026, 1, 1, 18, 29)) == "2026-01-01"
+    window = windows.window("Asia/Kolkata", datetime(2026, 1, 1, 18, 30))
+    assert window.day == "2026-01-02"
+    assert window.start == datetime(2026, 1, 1, 18, 30)
+    assert window.end == datetime(2026, 1, 2, 18, 30)
+    # DST day in New York is 23 hours long
+    window = windows.window("America/New_York", datetime(2026, 3, 8, 12, 0))
+    assert window.start == datetime(2026, 3, 8, 5, 0)
+    assert (window.end - window.start).total_seconds() == 23 * 3600
+
+
+def test_rollover_only_resets_zones_whose_day_ended(server):
+    async def run():
+        await server.init_database()
+        for name, zone in [("utc", "UTC"), ("india", "Asia/Kolkata")]:
+            user = server.User(username=name, email=f"{name}@example.com", password_hash="x",
+                               timezone=zone, total_stars=3, stars_day="2026-01-01")
+            await server.db.users.insert_one(user.dict())
+
+        # 19:00 UTC on Jan 1 is already Jan 2 in India
+        result = await server.run_daily_rollover(datetime(2026, 1, 1, 19, 0))
+        assert result["zones"] == {"UTC": 0, "Asia/Kolkata": 1}
+        stars = {u["username"]: u["total_stars"] async for u in server.db.users.find({})}
+        assert stars == {"utc": 3, "india": 0}
+
+        # Both zones were closed for their current day; nothing to do until the next midnight
+        result = await server.run_daily_rollover(datetime(2026, 1, 1, 20, 0))
+        assert result["zones"] == {}
+
+    asyncio.run(run())
+
+
+def test_zone_validation_rejects_directories_and_junk():
+    assert is_valid_zone("Asia/Kolkata")
+    assert is_valid_zone("UTC")
+    for name in ["America", "Etc", "Nowhere/City", "../etc/passwd", "A" * 5000, ""]:
+        assert not is_valid_zone(name)
+
+
+def test_zone_change_revokes_tokens_from_the_old_zone(server):
+    from fastapi import HTTPException
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    def bearer(token):
+        return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async def run():
+        user = server.User(username="traveller", email="t@example.com", password_hash="x",
+                           status=server.UserStatus.APPROVED)
+        await server.db.users.insert_one(user.dict())
+        old_token = server.create_access_token(data={"sub": user.id, "status": "approved", "ver": 0, "tz": "UTC"})
+        member = await server.get_current_member(bearer(old_token))
+
+        result = await server.update_timezone(server.TimezoneUpdate(timezone="Asia/Kolkata"), member)
+
+        with pytest.raises(HTTPException) as error:
+            await server.get_current_member(bearer(old_token))
+        assert error.value.status_code == 401
+        member = await server.get_current_member(bearer(result["access_token"]))
+        assert member.timezone == "Asia/Kolkata"
+
+    asyncio.run(run())